@@ -0,0 +1,36 @@
+"""Admission policy in front of grading.
+
+Three checks keep the queue fair during an exam rush:
+
+* a token bucket per student, so one student resubmitting in a loop is
+  refused with a ``Retry-After`` instead of queueing full pytest runs;
+* a global limit on submissions admitted but not finished yet;
+* coalescing: each student has at most one *pending* submission, and a newer
+  one supersedes it, so only the latest file waiting in the queue is graded.
+
+The state lives in the shared job queue (:mod:`backend.jobqueue`), so the
+limits hold across every API process; this module only has the policy.
+"""
+
+from typing import Tuple
+
+
+class AdmissionRejected(Exception):
+    """The submission was not admitted; ``reason`` is ``"rate_limited"`` or ``"busy"``."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def take_token(tokens: float, updated: float, now: float, *, rate: float, burst: int) -> Tuple[float, float]:
+    """Refills a bucket of ``burst`` tokens at ``rate`` per second and takes one.
+
+    Returns the tokens left and 0 or, when the bucket is empty, the refilled
+    tokens (none taken) and the seconds until the next one.
+    """
+    tokens = min(float(burst), tokens + max(0.0, now - updated) * rate)
+    if tokens < 1.0:
+        return tokens, (1.0 - tokens) / rate
+    return tokens - 1.0, 0.0
@@ -0,0 +1,269 @@
+"""Instructor analytics, maintained incrementally as submissions are graded.
+
+Every graded submission updates a handful of counters in SQLite (WAL mode,
+shared by every API process) in one transaction: the score histogram, the
+per-test run and pass counts, the student's attempts and first pass, and a
+per-minute failure count for each failing test. The cost is one row update
+per test of the submission, no matter how many submissions came before, and
+reading the dashboard never scans the submission store.
+
+Aggregates start counting when this store is created; submissions graded
+before that are not included.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import ContextManager, Iterable, List
+
+from .sqlite import connect, transaction
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS totals (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS score_histogram (
+    bucket INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS test_stats (
+    nodeid TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL,
+    passed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS students (
+    student TEXT PRIMARY KEY,
+    student_name TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    first_submitted_at REAL NOT NULL,
+    first_pass_at REAL,
+    best_score REAL NOT NULL,
+    last_score REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts_histogram (
+    attempts INTEGER PRIMARY KEY,
+    students INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failures_by_minute (
+    minute INTEGER NOT NULL,
+    nodeid TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (minute, nodeid)
+) WITHOUT ROWID;
+"""
+
+# Scores fall in ten 10-point buckets (0-9.99, ..., 90-99.99) plus one for 100.
+_BUCKETS = 11
+
+
+def _bucket(score: float) -> int:
+    return min(_BUCKETS - 1, max(0, int(score // 10)))
+
+
+def _time_to_pass(first_submitted_at: float | None, first_pass_at: float | None) -> float | None:
+    if first_submitted_at is None or first_pass_at is None:
+        return None
+    return max(0.0, first_pass_at - first_submitted_at)
+
+
+class AnalyticsStore:
+    def __init__(self, db_path: Path, *, pass_score: float) -> None:
+        self.db_path = db_path
+        # A submission scoring at least this much counts as a pass.
+        self.pass_score = pass_score
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def open(self) -> None:
+        self._db = connect(self.db_path, _SCHEMA)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _transaction(self) -> ContextManager[sqlite3.Connection]:
+        return transaction(self._db, self._lock)
+
+    @staticmethod
+    def _add(db: sqlite3.Connection, table: str, key_column: str, key, column: str, amount: float) -> None:
+        db.execute(
+            f"INSERT INTO {table} ({key_column}, {column}) VALUES (?, ?) "
+            f"ON CONFLICT({key_column}) DO UPDATE SET {column} = {column} + excluded.{column}",
+            (key, amount),
+        )
+
+    # -- writing -------------------------------------------------------------
+
+    def record(
+        self,
+        student: str,
+        student_name: str,
+        submitted_at: float,
+        score: float,
+        tests: Iterable[dict],
+        failed: Iterable[str],
+        *,
+        sandbox_failure: bool = False,
+    ) -> None:
+        """Folds one graded submission into the aggregates.
+
+        ``tests`` are the call-phase reports (``nodeid`` and ``outcome``) and
+        ``failed`` the nodeids reported as failing, as in the failure log.
+        A ``sandbox_failure`` (the grading process was stopped) is counted
+        apart and has no tests; it still counts as an attempt with its score.
+        Submissions may be recorded out of order (several processes grade in
+        parallel): a student's first attempt and first pass are minima.
+        """
+        passed = score >= self.pass_score
+        minute = int(submitted_at // 60)
+        with self._transaction() as db:
+            self._add(db, "totals", "key", "submissions", "value", 1)
+            self._add(db, "totals", "key", "score_sum", "value", score)
+            if passed:
+                self._add(db, "totals", "key", "passed_submissions", "value", 1)
+            if sandbox_failure:
+                self._add(db, "totals", "key", "sandbox_failures", "value", 1)
+            self._add(db, "score_histogram", "bucket", _bucket(score), "count", 1)
+
+            for test in tests:
+                db.execute(
+                    "INSERT INTO test_stats (nodeid, runs, passed) VALUES (?, 1, ?) "
+                    "ON CONFLICT(nodeid) DO UPDATE SET runs = runs + 1, passed = passed + excluded.passed",
+                    (test["nodeid"], int(test["outcome"] == "passed")),
+                )
+            for nodeid in failed:
+                db.execute(
+                    "INSERT INTO failures_by_minute (minute, nodeid, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT(minute, nodeid) DO UPDATE SET count = count + 1",
+                    (minute, nodeid),
+                )
+
+            row = db.execute(
+                "SELECT attempts, first_submitted_at, first_pass_at, best_score FROM students WHERE student = ?",
+                (student,),
+            ).fetchone()
+            if row is None:
+                attempts, first_submitted_at, first_pass_at, best_score = 0, None, None, score
+            else:
+                attempts, first_submitted_at, first_pass_at, best_score = row
+            old_time_to_pass = _time_to_pass(first_submitted_at, first_pass_at)
+
+            new_first_submitted_at = submitted_at if first_submitted_at is None else min(first_submitted_at, submitted_at)
+            new_first_pass_at = first_pass_at
+            if passed:
+                new_first_pass_at = submitted_at if first_pass_at is None else min(first_pass_at, submitted_at)
+            db.execute(
+                "INSERT INTO students (student, student_name, attempts, first_submitted_at, first_pass_at, "
+                "best_score, last_score) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(student) DO UPDATE SET student_name = excluded.student_name, "
+                "attempts = excluded.attempts, first_submitted_at = excluded.first_submitted_at, "
+                "first_pass_at = excluded.first_pass_at, best_score = excluded.best_score, "
+                "last_score = excluded.last_score",
+                (
+                    student,
+                    student_name,
+                    attempts + 1,
+                    new_first_submitted_at,
+                    new_first_pass_at,
+                    max(best_score, score),
+                    score,
+                ),
+            )
+            if attempts:
+                self._add(db, "attempts_histogram", "attempts", attempts, "students", -1)
+            self._add(db, "attempts_histogram", "attempts", attempts + 1, "students", 1)
+
+            # Sum and count of every student's time to first pass; an
+            # out-of-order record can move an existing value, hence the delta.
+            new_time_to_pass = _time_to_pass(new_first_submitted_at, new_first_pass_at)
+            if new_time_to_pass is not None:
+                if old_time_to_pass is None:
+                    self._add(db, "totals", "key", "first_pass_students", "value", 1)
+                self._add(db, "totals", "key", "first_pass_seconds", "value", new_time_to_pass - (old_time_to_pass or 0.0))
+
+    def prune(self, before: float) -> None:
+        """Drops per-minute failure counts older than ``before``; other aggregates are kept."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM failures_by_minute WHERE minute < ?", (int(before // 60),))
+
+    # -- reading -------------------------------------------------------------
+
+    def summary(self, *, window_seconds: float, top: int) -> dict:
+        """The dashboard: totals, score histogram, per-test pass rates, attempts and top failing tests."""
+        since_minute = int((time.time() - window_seconds) // 60)
+        with self._lock:
+            db = self._db
+            totals = dict(db.execute("SELECT key, value FROM totals").fetchall())
+            histogram = dict(db.execute("SELECT bucket, count FROM score_histogram").fetchall())
+            tests = db.execute(
+                "SELECT nodeid, runs, passed FROM test_stats ORDER BY CAST(passed AS REAL) / runs, nodeid"
+            ).fetchall()
+            attempts = db.execute(
+                "SELECT attempts, students FROM attempts_histogram WHERE students > 0 ORDER BY attempts"
+            ).fetchall()
+            failing = db.execute(
+                "SELECT nodeid, SUM(count) AS total FROM failures_by_minute WHERE minute >= ? "
+                "GROUP BY nodeid ORDER BY total DESC, nodeid LIMIT ?",
+                (since_minute, top),
+            ).fetchall()
+
+        submissions = int(totals.get("submissions", 0))
+        students = sum(count for _, count in attempts)
+        first_pass_students = int(totals.get("first_pass_students", 0))
+        return {
+            "submissions": submissions,
+            "mean_score": round(totals.get("score_sum", 0.0) / submissions, 2) if submissions else None,
+            "pass_score": self.pass_score,
+            "passed_submissions": int(totals.get("passed_submissions", 0)),
+            "sandbox_failures": int(totals.get("sandbox_failures", 0)),
+            "score_histogram": [
+                {"from": bucket * 10, "to": 100 if bucket == _BUCKETS - 1 else bucket * 10 + 10, "count": histogram.get(bucket, 0)}
+                for bucket in range(_BUCKETS)
+            ],
+            "tests": [
+                {"nodeid": nodeid, "runs": runs, "passed": passed, "pass_rate": round(passed / runs, 4)}
+                for nodeid, runs, passed in tests
+            ],
+            "students": {
+                "count": students,
+                "mean_attempts": round(submissions / students, 2) if students else None,
+                "attempts_histogram": [{"attempts": count, "students": total} for count, total in attempts],
+            },
+            "time_to_first_pass": {
+                "students": first_pass_students,
+                "mean_seconds": round(totals["first_pass_seconds"] / first_pass_students, 1)
+                if first_pass_students
+                else None,
+            },
+            "top_failing": {
+                "window_seconds": window_seconds,
+                "tests": [{"nodeid": nodeid, "count": count} for nodeid, count in failing],
+            },
+        }
+
+    def students(self, *, limit: int, offset: int = 0) -> List[dict]:
+        """Per-student attempts, scores and time to first pass, most attempts first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT student, student_name, attempts, first_submitted_at, first_pass_at, best_score, last_score "
+                "FROM students ORDER BY attempts DESC, student LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [
+            {
+                "student": student,
+                "student_name": student_name,
+                "attempts": attempts,
+                "best_score": best_score,
+                "last_score": last_score,
+                "first_submitted_at": first_submitted_at,
+                "time_to_first_pass": _time_to_pass(first_submitted_at, first_pass_at),
+            }
+            for student, student_name, attempts, first_submitted_at, first_pass_at, best_score, last_score in rows
+        ]
@@ -0,0 +1,169 @@
+"""Grading-result cache keyed by submission content and the official test suite."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+class SuiteFingerprint:
+    """SHA-256 over every file of the test suite, recomputed only when a file changes.
+
+    Each lookup costs one ``stat`` per file; the contents are re-hashed only
+    when a path, size or mtime differs from the last call.
+    """
+
+    def __init__(self, tests_dir: Path) -> None:
+        self.tests_dir = tests_dir
+        self._signature: Tuple = ()
+        self._digest = ""
+        self._lock = threading.Lock()
+
+    def _files(self):
+        for path in sorted(self.tests_dir.rglob("*")):
+            if path.is_file() and "__pycache__" not in path.parts:
+                yield path
+
+    def current(self) -> str:
+        files = list(self._files())
+        signature = tuple(
+            (str(path.relative_to(self.tests_dir)), stat.st_size, stat.st_mtime_ns)
+            for path, stat in ((path, path.stat()) for path in files)
+        )
+        with self._lock:
+            if signature != self._signature:
+                digest = hashlib.sha256()
+                for path in files:
+                    digest.update(str(path.relative_to(self.tests_dir)).encode("utf-8"))
+                    digest.update(b"\0")
+                    digest.update(path.read_bytes())
+                    digest.update(b"\0")
+                self._signature = signature
+                self._digest = digest.hexdigest()
+            return self._digest
+
+
+class ResultCache:
+    """LRU cache of grading results, optionally persisted as one JSON file per entry.
+
+    Keys are ``(suite_fingerprint, submission_sha256)``. Whenever a new suite
+    fingerprint shows up, entries graded against older suites are dropped
+    from memory and disk.
+
+    On disk, a hit refreshes the file's mtime and, once this process counts
+    more than ``max_disk_entries`` files, the oldest tenth is deleted. The
+    directory may be shared by several processes, each counting its own
+    writes, so the cap is checked against a fresh listing before pruning.
+    """
+
+    def __init__(self, max_entries: int, directory: Path | None = None, *, max_disk_entries: int | None = None) -> None:
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self._fingerprint = ""
+        # Files of the current suite on disk, as far as this process knows;
+        # None until counted.
+        self._disk_entries: int | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, fingerprint: str, digest: str) -> Path:
+        return self.directory / fingerprint[:16] / f"{digest}.json"
+
+    def _switch_suite(self, fingerprint: str) -> None:
+        if fingerprint == self._fingerprint:
+            return
+        self._fingerprint = fingerprint
+        self._entries.clear()
+        self._disk_entries = None
+        if self.directory is None or not self.directory.exists():
+            return
+        for child in self.directory.iterdir():
+            if child.is_dir() and child.name != fingerprint[:16]:
+                shutil.rmtree(child, ignore_errors=True)
+
+    def get(self, fingerprint: str, digest: str) -> dict | None:
+        key = (fingerprint, digest)
+        with self._lock:
+            self._switch_suite(fingerprint)
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.directory is not None:
+            path = self._entry_path(fingerprint, digest)
+            try:
+                value = json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path)
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._remember(key, value)
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: Tuple[str, str], value: dict) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, fingerprint: str, digest: str, value: dict) -> None:
+        with self._lock:
+            self._switch_suite(fingerprint)
+            self._remember((fingerprint, digest), value)
+        if self.directory is None:
+            return
+        path = self._entry_path(fingerprint, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        existed = path.exists()
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(value, handle, ensure_ascii=False)
+        os.replace(tmp, path)
+        if self.max_disk_entries is None:
+            return
+        with self._lock:
+            if self._disk_entries is None:
+                self._disk_entries = len(self._disk_files(path.parent))
+            elif not existed:
+                self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._prune_disk(path.parent)
+
+    @staticmethod
+    def _disk_files(suite_dir: Path) -> List[os.DirEntry]:
+        with os.scandir(suite_dir) as entries:
+            return [entry for entry in entries if entry.name.endswith(".json")]
+
+    def _prune_disk(self, suite_dir: Path) -> None:
+        """Deletes the least recently used files down to nine tenths of the cap."""
+        files = []
+        for entry in self._disk_files(suite_dir):
+            try:
+                files.append((entry.stat().st_mtime_ns, entry.path))
+            except FileNotFoundError:
+                pass
+        keep = self.max_disk_entries * 9 // 10
+        files.sort()
+        for _, path in files[: max(0, len(files) - keep)]:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+        self._disk_entries = min(len(files), keep)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,66 @@
+"""Settings shared by the API and the command-line tools, read from the environment."""
+
+import os
+import tempfile
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TESTS_DIR = BASE_DIR / "tests"
+SUBMISSIONS_DIR = BASE_DIR / "submissions"
+LOG_FILE = BASE_DIR / "backend" / "failure_log.json"
+FAILURE_DB = Path(os.environ.get("FAILURE_DB", BASE_DIR / "backend" / "failure_log.db"))
+FAILURE_FLUSH_SECONDS = float(os.environ.get("FAILURE_FLUSH_SECONDS", "1"))
+
+# API processes per container (uvicorn reads WEB_CONCURRENCY as its --workers
+# default). Each one runs its own graders, so the CPUs are split among them.
+API_PROCESSES = int(os.environ.get("WEB_CONCURRENCY", "1"))
+GRADER_WORKERS = int(os.environ.get("GRADER_WORKERS", max(1, (os.cpu_count() or 1) // API_PROCESSES)))
+GRADER_QUEUE_SIZE = int(os.environ.get("GRADER_QUEUE_SIZE", "100"))
+GRADER_RETRY_AFTER = int(os.environ.get("GRADER_RETRY_AFTER", "5"))
+
+# "pool" grades in pre-forked workers that already imported pytest and the
+# official tests; "subprocess" starts a fresh sandboxed child per submission.
+GRADER_MODE = os.environ.get("GRADER_MODE", "pool")
+GRADER_CPU_SECONDS = int(os.environ.get("GRADER_CPU_SECONDS", "30"))
+GRADER_WALL_SECONDS = float(os.environ.get("GRADER_WALL_SECONDS", "60"))
+GRADER_MEMORY_MB = int(os.environ.get("GRADER_MEMORY_MB", "512"))
+# Budget of every test phase; a test that exceeds it is reported as "timeout".
+GRADER_TEST_WALL_SECONDS = float(os.environ.get("GRADER_TEST_WALL_SECONDS", "5"))
+GRADER_TEST_CPU_SECONDS = float(os.environ.get("GRADER_TEST_CPU_SECONDS", "5"))
+# Parent of the per-run scratch directories; a tmpfs when one is available.
+GRADER_SCRATCH_DIR = os.environ.get("GRADER_SCRATCH_DIR") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+)
+# Assertion-rewritten test modules, compiled once and reused by every worker
+# and sandboxed child (see grader.RewrittenTestCache).
+GRADER_BYTECODE_DIR = os.environ.get("GRADER_BYTECODE_DIR") or os.path.join(
+    GRADER_SCRATCH_DIR or tempfile.gettempdir(), "exam-autograder-pyc"
+)
+GRADER_MAX_RUNS = int(os.environ.get("GRADER_MAX_RUNS", "50"))
+# When other workers are idle and nobody is queued, one submission's tests
+# are split across up to this many workers (pool mode only).
+GRADER_MAX_SHARDS = int(os.environ.get("GRADER_MAX_SHARDS", min(4, os.cpu_count() or 1)))
+# Jobs shared by every API process (and container, if they share the volume).
+JOBS_DB = Path(os.environ.get("JOBS_DB", SUBMISSIONS_DIR / "jobs.db"))
+# How often a process looks for jobs queued, or events published, by the others.
+GRADER_QUEUE_POLL_SECONDS = float(os.environ.get("GRADER_QUEUE_POLL_SECONDS", "0.2"))
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", "3600"))
+JOB_PRUNE_SECONDS = float(os.environ.get("JOB_PRUNE_SECONDS", "60"))
+# Instructor aggregates, updated as every submission is graded.
+ANALYTICS_DB = Path(os.environ.get("ANALYTICS_DB", SUBMISSIONS_DIR / "analytics.db"))
+# A submission scoring at least this much counts as a pass.
+ANALYTICS_PASS_SCORE = float(os.environ.get("ANALYTICS_PASS_SCORE", "60"))
+# Per-minute failure counts are kept this long (the widest "top failing" window).
+ANALYTICS_WINDOW_SECONDS = int(os.environ.get("ANALYTICS_WINDOW_SECONDS", 7 * 24 * 3600))
+GRADER_CACHE_SIZE = int(os.environ.get("GRADER_CACHE_SIZE", "1024"))
+GRADER_CACHE_DIR = os.environ.get("GRADER_CACHE_DIR")
+# Entries kept in GRADER_CACHE_DIR; the least recently used are deleted beyond it.
+GRADER_CACHE_DISK_ENTRIES = int(os.environ.get("GRADER_CACHE_DISK_ENTRIES", "10000"))
+GRADER_MAX_UPLOAD_BYTES = int(os.environ.get("GRADER_MAX_UPLOAD_BYTES", 1024 * 1024))
+# When set, a JSON trace of every finished job is also written to this folder.
+GRADER_TRACE_DIR = os.environ.get("GRADER_TRACE_DIR")
+# Per-student token bucket: GRADER_RATE_BURST submissions at once, then one
+# more every 60/GRADER_RATE_PER_MINUTE seconds (0 disables it).
+GRADER_RATE_PER_MINUTE = float(os.environ.get("GRADER_RATE_PER_MINUTE", "6"))
+GRADER_RATE_BURST = int(os.environ.get("GRADER_RATE_BURST", "3"))
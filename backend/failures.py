@@ -0,0 +1,253 @@
+"""Failure statistics shared by every API process.
+
+Each graded submission appends one line to an append-only journal (guarded
+by ``flock``) and bumps an in-memory view, so recording and reading are
+O(1). ``flush`` folds the journal into aggregated counters in SQLite (WAL
+mode) and stores the journal offset in the same transaction, so every line
+is applied exactly once even when several processes flush or one of them
+crashes. The journal is rotated once it grows past ``max_journal_bytes``.
+
+Every flush that changes a counter bumps a global ``version`` stored in
+SQLite and stamps the touched rows with it, which lets pollers ask for the
+counters that changed since the version they last saw.
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Set
+
+from .sqlite import connect, transaction
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failures (
+    nodeid TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_feedback TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class FailureStore:
+    def __init__(
+        self,
+        db_path: Path,
+        journal_path: Path,
+        feedback: Callable[[str], str],
+        *,
+        max_journal_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
+        self.db_path = db_path
+        self.journal_path = journal_path
+        self.feedback = feedback
+        self.max_journal_bytes = max_journal_bytes
+        self._lock = threading.Lock()
+        self._view: Dict[str, dict] = {}
+        self._node_versions: Dict[str, int] = {}
+        self.version = 0
+        # Counters recorded here but not flushed yet, and how many records
+        # that is; both reset on flush and feed the ETag.
+        self._unflushed: Set[str] = set()
+        self._unflushed_records = 0
+        self._instance = uuid.uuid4().hex[:8]
+        self._db: sqlite3.Connection | None = None
+        self._journal_lock_fd: int | None = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def open(self, legacy_json: Path | None = None) -> None:
+        self._db = connect(self.db_path, _SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(failures)")}
+        if "version" not in columns:
+            self._db.execute("ALTER TABLE failures ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._journal_lock_fd = os.open(
+            self.journal_path.with_name(self.journal_path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644
+        )
+        if legacy_json is not None:
+            self._import_legacy(legacy_json)
+        self.flush()
+
+    def close(self) -> None:
+        if self._db is None:
+            return
+        self.flush()
+        self._db.close()
+        self._db = None
+        os.close(self._journal_lock_fd)
+        self._journal_lock_fd = None
+
+    def _import_legacy(self, legacy_json: Path) -> None:
+        """One-time import of the counters kept in the old failure_log.json."""
+        if not legacy_json.exists():
+            return
+        try:
+            data = json.loads(legacy_json.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        failures = data.get("failures")
+        if not isinstance(failures, dict):
+            return
+        with transaction(self._db) as db:
+            if self._meta("legacy_imported"):
+                return
+            version = self._meta("version") + 1
+            for nodeid, info in failures.items():
+                feedback = info.get("last_feedback", info.get("last_message", ""))
+                db.execute(
+                    "INSERT INTO failures (nodeid, count, last_feedback, version) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(nodeid) DO UPDATE SET count = count + excluded.count, version = excluded.version",
+                    (nodeid, int(info.get("count", 0)), feedback or "", version),
+                )
+            self._set_meta("version", version)
+            self._set_meta("legacy_imported", 1)
+
+    # -- helpers -------------------------------------------------------------
+
+    def _meta(self, key: str) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._db.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    @staticmethod
+    def _parse_lines(data: bytes, counts: Counter) -> int:
+        """Adds complete journal lines to ``counts``; returns the bytes consumed."""
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                counts.update(json.loads(line)["nodeids"])
+            except (ValueError, KeyError, TypeError):
+                continue
+        return end
+
+    def _apply_counts(self, counts: Counter) -> None:
+        if not counts:
+            return
+        version = self._meta("version") + 1
+        for nodeid, count in counts.items():
+            self._db.execute(
+                "INSERT INTO failures (nodeid, count, last_feedback, version) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(nodeid) DO UPDATE SET count = count + excluded.count, "
+                "last_feedback = excluded.last_feedback, version = excluded.version",
+                (nodeid, count, self.feedback(nodeid), version),
+            )
+        self._set_meta("version", version)
+
+    def _segment_path(self, generation: int) -> Path:
+        return self.journal_path.with_name(f"{self.journal_path.name}.{generation}")
+
+    @staticmethod
+    def _read_from(path: Path, offset: int) -> bytes:
+        try:
+            with path.open("rb") as handle:
+                handle.seek(offset)
+                return handle.read()
+        except FileNotFoundError:
+            return b""
+
+    # -- public API ----------------------------------------------------------
+
+    def record(self, nodeids: Iterable[str]) -> dict:
+        """Counts one failure per nodeid (repeats included) and returns the current view."""
+        nodeids = list(nodeids)
+        if not nodeids:
+            return self.snapshot()
+        line = json.dumps({"nodeids": nodeids}, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            fcntl.flock(self._journal_lock_fd, fcntl.LOCK_EX)
+            try:
+                fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            finally:
+                fcntl.flock(self._journal_lock_fd, fcntl.LOCK_UN)
+            view = dict(self._view)
+            for nodeid in set(nodeids):
+                current = view.get(nodeid, {"count": 0})
+                view[nodeid] = {
+                    "count": current["count"] + nodeids.count(nodeid),
+                    "last_feedback": self.feedback(nodeid),
+                }
+            self._view = view
+            self._unflushed.update(nodeids)
+            self._unflushed_records += 1
+        return self.snapshot()
+
+    def flush(self) -> None:
+        """Applies every journal line not yet folded into SQLite, then reloads the view."""
+        with self._lock:
+            fcntl.flock(self._journal_lock_fd, fcntl.LOCK_EX)
+            try:
+                self._flush_locked()
+            finally:
+                fcntl.flock(self._journal_lock_fd, fcntl.LOCK_UN)
+            rows = self._db.execute("SELECT nodeid, count, last_feedback, version FROM failures").fetchall()
+            self._view = {nodeid: {"count": count, "last_feedback": feedback} for nodeid, count, feedback, _ in rows}
+            self._node_versions = {row[0]: row[3] for row in rows}
+            self.version = self._meta("version")
+            self._unflushed.clear()
+            self._unflushed_records = 0
+
+    def _flush_locked(self) -> None:
+        with transaction(self._db):
+            offset = self._meta("journal_offset")
+            generation = self._meta("journal_generation")
+            counts: Counter = Counter()
+            interrupted = self._segment_path(generation + 1)
+            if interrupted.exists():
+                # The journal was rotated but that transaction never
+                # committed: the segment still has unapplied lines.
+                self._parse_lines(self._read_from(interrupted, offset), counts)
+                generation += 1
+                offset = 0
+            offset += self._parse_lines(self._read_from(self.journal_path, offset), counts)
+            self._apply_counts(counts)
+            if offset >= self.max_journal_bytes:
+                generation += 1
+                os.replace(self.journal_path, self._segment_path(generation))
+                offset = 0
+            self._set_meta("journal_offset", offset)
+            self._set_meta("journal_generation", generation)
+        # Segments up to the committed generation are fully applied.
+        self._segment_path(generation).unlink(missing_ok=True)
+
+    def snapshot(self) -> dict:
+        return {"failures": self._view, "version": self.version}
+
+    def etag(self) -> str:
+        if not self._unflushed_records:
+            return f'W/"{self.version}"'
+        return f'W/"{self.version}-{self._instance}-{self._unflushed_records}"'
+
+    def changes_since(self, since: int) -> dict:
+        """Counters whose value changed after ``since`` (plus any not flushed yet).
+
+        A ``since`` newer than this store has seen (e.g. the database was
+        reset) yields the full view flagged with ``"full": true``.
+        """
+        view = self._view
+        if since > self.version:
+            return {"failures": view, "version": self.version, "full": True}
+        changed = {
+            nodeid: info
+            for nodeid, info in view.items()
+            if self._node_versions.get(nodeid, 0) > since or nodeid in self._unflushed
+        }
+        return {"failures": changed, "version": self.version, "full": False}
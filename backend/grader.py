@@ -0,0 +1,503 @@
+"""Grading core shared by the warm pool workers and the sandboxed grading child.
+
+This module must stay importable without FastAPI: it is executed as a script
+(``python -I grader.py <submission> <tests_dir>``) inside each sandboxed
+child process, where it runs pytest and streams JSON lines to stdout, and it
+is the entry point of the pre-forked pool workers (``worker_main``).
+"""
+
+import argparse
+import hashlib
+import importlib
+import importlib.abc
+import importlib.util
+import json
+import marshal
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import types
+from pathlib import Path
+from typing import Callable, Dict, List
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+import pytest
+
+
+SUBMISSION_MODULE = "bookbyte"
+
+
+ReportCallback = Callable[[dict], None]
+
+
+class TestTimeout(BaseException):
+    """Raised inside a test phase that blew its wall-clock or CPU budget.
+
+    It derives from ``BaseException`` so a student's ``except Exception``
+    can't swallow it and keep looping.
+    """
+
+
+class TestBudget:
+    """pytest plugin that bounds every test phase (setup, call, teardown).
+
+    ``ITIMER_REAL`` enforces the wall-clock budget and ``ITIMER_PROF`` the
+    CPU budget; either one raises :class:`TestTimeout` in the running test,
+    which pytest records as a failure and the collector reports with the
+    ``timeout`` outcome. Code stuck inside a single C call can't be
+    interrupted this way; the per-submission limits cover that case.
+    """
+
+    __test__ = False
+
+    def __init__(self, wall_seconds: float, cpu_seconds: float) -> None:
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.enabled = (
+            hasattr(signal, "setitimer")
+            and bool(wall_seconds or cpu_seconds)
+            and threading.current_thread() is threading.main_thread()
+        )
+        self.timed_out = False
+        if self.enabled:
+            signal.signal(signal.SIGALRM, self._expire)
+            signal.signal(signal.SIGPROF, self._expire)
+
+    def _expire(self, signum, frame):
+        self._disarm()
+        if signum == signal.SIGPROF:
+            raise TestTimeout(f"El test superó el límite de {self.cpu_seconds:g} segundos de CPU")
+        raise TestTimeout(f"El test superó el límite de {self.wall_seconds:g} segundos")
+
+    def _arm(self) -> None:
+        if self.wall_seconds:
+            signal.setitimer(signal.ITIMER_REAL, self.wall_seconds)
+        if self.cpu_seconds:
+            signal.setitimer(signal.ITIMER_PROF, self.cpu_seconds)
+
+    def _disarm(self) -> None:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.setitimer(signal.ITIMER_PROF, 0)
+
+    def _bounded(self):
+        if not self.enabled:
+            return (yield)
+        self._arm()
+        try:
+            return (yield)
+        finally:
+            self._disarm()
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_setup(self, item):
+        return (yield from self._bounded())
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_call(self, item):
+        return (yield from self._bounded())
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        return (yield from self._bounded())
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        if call.excinfo is not None and call.excinfo.errisinstance(TestTimeout):
+            report.timed_out = True
+            self.timed_out = True
+        return report
+
+
+class PytestResultCollector:
+    def __init__(self, on_report: ReportCallback | None = None) -> None:
+        self.results: List[dict] = []
+        self.collected: List[str] = []
+        self.on_report = on_report
+        self._marks: Dict[str, float] = {}
+
+    def _append_report(
+        self, *, nodeid: str, outcome: str, message: str | None, phase: str, duration: float | None = None
+    ) -> None:
+        entry = {"nodeid": nodeid, "outcome": outcome}
+        if phase != "call":
+            entry["phase"] = phase
+        if message:
+            entry["message"] = message
+        if duration is not None:
+            entry["duration"] = round(duration, 6)
+        self.results.append(entry)
+        if self.on_report is not None:
+            self.on_report(entry)
+
+    def pytest_runtest_logreport(self, report):  # type: ignore[override]
+        if report.when != "call" and report.passed:
+            return
+        message = str(report.longrepr) if report.failed and report.longrepr else None
+        self._append_report(
+            nodeid=report.nodeid,
+            outcome="timeout" if getattr(report, "timed_out", False) else report.outcome,
+            message=message,
+            phase=report.when,
+            duration=report.duration,
+        )
+
+    def pytest_itemcollected(self, item):  # type: ignore[override]
+        self.collected.append(item.nodeid)
+
+    def pytest_sessionstart(self, session):  # type: ignore[override]
+        self._marks["start"] = time.perf_counter()
+
+    def pytest_collection_finish(self, session):  # type: ignore[override]
+        self._marks["collected"] = time.perf_counter()
+
+    def pytest_sessionfinish(self, session, exitstatus):  # type: ignore[override]
+        self._marks["finish"] = time.perf_counter()
+
+    def timings(self) -> Dict[str, float]:
+        """Seconds spent collecting and executing the tests of the last session."""
+        start = self._marks.get("start")
+        finish = self._marks.get("finish")
+        if start is None or finish is None:
+            return {}
+        collected = self._marks.get("collected", finish)
+        return {"collection": collected - start, "execution": finish - collected}
+
+    def pytest_collectreport(self, report):  # type: ignore[override]
+        if report.failed:
+            message = str(report.longrepr) if report.longrepr else None
+            nodeid = getattr(report, "nodeid", None) or str(report.fspath)
+            self._append_report(
+                nodeid=nodeid,
+                outcome="failed",
+                message=message,
+                phase="collect",
+            )
+
+
+class ChangeCwd:
+    def __init__(self, new_cwd: Path) -> None:
+        self.new_cwd = new_cwd
+        self.old_cwd = Path.cwd()
+
+    def __enter__(self):
+        os.chdir(self.new_cwd)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        os.chdir(self.old_cwd)
+
+
+class SubmissionFinder(importlib.abc.MetaPathFinder):
+    """Serves ``import bookbyte`` from whatever submission is being graded."""
+
+    def __init__(self) -> None:
+        self.path: str | None = None
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname != SUBMISSION_MODULE or self.path is None:
+            return None
+        return importlib.util.spec_from_file_location(SUBMISSION_MODULE, self.path)
+
+
+_finder = SubmissionFinder()
+
+
+def _reset_pytest_state() -> None:
+    """Forgets every module loaded from a submission so the next run starts clean."""
+    submission = _finder.path
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and path == submission:
+            sys.modules.pop(name, None)
+    sys.modules.pop(SUBMISSION_MODULE, None)
+    importlib.invalidate_caches()
+
+
+def _warm_pytest_args(tests_dir: Path, nodeids: List[str] | None = None) -> List[str]:
+    # The official tests are collected in place, so their nodeids keep the
+    # "tests/" prefix the feedback map is keyed on.
+    targets = [str(tests_dir.parent / nodeid) for nodeid in nodeids] if nodeids else [str(tests_dir)]
+    return ["-q", "--maxfail=0", "-p", "no:cacheprovider", "--rootdir", str(tests_dir.parent), *targets]
+
+
+def _install_finder() -> None:
+    if _finder not in sys.meta_path:
+        sys.meta_path.insert(0, _finder)
+
+
+class RewrittenTestCache:
+    """Assertion-rewritten code of the official test modules, shared on disk.
+
+    pytest rewrites the ``assert`` statements of every test module it imports
+    and would keep the result as a pyc next to the tests, but the image sets
+    ``PYTHONDONTWRITEBYTECODE`` and the sandboxed children run with ``-B``, so
+    every fresh worker or child rewrote the suite again. Here each module is
+    rewritten once and its code object marshalled under a key made of its
+    path, its source and the Python and pytest versions: a changed test file
+    is just a miss, never a stale hit.
+
+    The directory is writable by the uid that runs student code, so nothing
+    found there is trusted: :meth:`precompile` runs in a process that never
+    imports a submission and returns the SHA-256 of every entry it wrote, and
+    workers and children built with those ``digests`` only load an entry whose
+    bytes match. Anything else is rewritten again in memory and not stored.
+    """
+
+    def __init__(self, directory: Path, digests: Dict[str, str] | None = None) -> None:
+        self.directory = directory
+        self.digests = digests or {}
+        self._rewrite = None
+
+    def path_for(self, fn: Path, source: bytes) -> Path:
+        digest = hashlib.sha256()
+        for part in (str(fn).encode(), source, pytest.__version__.encode(), importlib.util.MAGIC_NUMBER):
+            digest.update(part)
+            digest.update(b"\0")
+        return self.directory / f"{fn.stem}-{digest.hexdigest()[:32]}.{sys.implementation.cache_tag}.pyc"
+
+    def rewrite(self, fn: Path, config) -> tuple:
+        """Drop-in replacement for pytest's ``_rewrite_test``: ``(stat, code)`` of ``fn``."""
+        path = self.path_for(fn, fn.read_bytes())
+        expected = self.digests.get(path.name)
+        if expected is not None:
+            try:
+                data = path.read_bytes()
+            except OSError:
+                data = None
+            # Hash and unmarshal the same bytes, so a swap in between changes nothing.
+            if data is not None and hashlib.sha256(data).hexdigest() == expected:
+                code = marshal.loads(data)
+                if isinstance(code, types.CodeType):
+                    return os.stat(fn), code
+        return self._rewrite(fn, config)
+
+    def install(self) -> None:
+        """Routes pytest's assertion rewriting through this cache."""
+        from _pytest.assertion import rewrite
+
+        if rewrite._rewrite_test != self.rewrite:
+            self._rewrite = rewrite._rewrite_test
+            rewrite._rewrite_test = self.rewrite
+
+    def precompile(self, tests_dir: Path) -> Dict[str, str]:
+        """Rewrites every test module of ``tests_dir`` into the directory and drops stale entries.
+
+        Entries already there are overwritten, never read. Returns the
+        SHA-256 of each entry written, by file name; a module that could not
+        be stored is left out (and rewritten by whoever imports it).
+        """
+        from _pytest.assertion import rewrite
+
+        modules = sorted(
+            path
+            for path in tests_dir.rglob("*.py")
+            if path.name.startswith("test_") or path.name.endswith("_test.py") or path.name == "conftest.py"
+        )
+        digests: Dict[str, str] = {}
+        for fn in modules:
+            path = self.path_for(fn, fn.read_bytes())
+            # The session's config only matters for the assertion-pass hook,
+            # which the graders never enable.
+            _, code = rewrite._rewrite_test(fn, None)
+            data = marshal.dumps(code)
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                fd, partial = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as handle:
+                    handle.write(data)
+                os.replace(partial, path)
+            except OSError:
+                continue
+            digests[path.name] = hashlib.sha256(data).hexdigest()
+        if self.directory.exists():
+            for stale in self.directory.glob(f"*.{sys.implementation.cache_tag}.pyc"):
+                if stale.name not in digests:
+                    stale.unlink(missing_ok=True)
+        return digests
+
+
+def warm_up(tests_dir: Path) -> List[str]:
+    """Imports and assertion-rewrites the official test modules once.
+
+    pytest imports test modules by basename and reuses them from
+    ``sys.modules`` on every later session, so subsequent runs skip
+    rewriting entirely. Returns the collected nodeids in collection order.
+    """
+    _install_finder()
+    collector = PytestResultCollector()
+    pytest.main(_warm_pytest_args(tests_dir) + ["--collect-only"], plugins=[collector])
+    return collector.collected
+
+
+def grade_submission(
+    submission_path: str,
+    tests_dir: Path,
+    on_report: ReportCallback | None = None,
+    *,
+    test_wall_seconds: float = 0,
+    test_cpu_seconds: float = 0,
+    scratch_dir: str | None = None,
+    nodeids: List[str] | None = None,
+) -> dict:
+    """Runs the official tests (or just ``nodeids``) in place against one stored submission.
+
+    Nothing is copied: the shared, read-only ``tests_dir`` is collected where
+    it is, ``import bookbyte`` is served from ``submission_path`` by the
+    import hook, and the only per-run directory is an empty scratch cwd
+    (under ``scratch_dir``, typically a tmpfs) for whatever the student's
+    code writes.
+    """
+    started = time.perf_counter()
+    _finder.path = submission_path
+    _reset_pytest_state()
+    collector = PytestResultCollector(on_report)
+    budget = TestBudget(test_wall_seconds, test_cpu_seconds)
+    try:
+        with tempfile.TemporaryDirectory(dir=scratch_dir) as scratch, ChangeCwd(Path(scratch)):
+            staging = time.perf_counter() - started
+            exit_code = pytest.main(_warm_pytest_args(tests_dir, nodeids), plugins=[collector, budget])
+    finally:
+        _reset_pytest_state()
+        _finder.path = None
+    timings = {"staging": staging, **collector.timings()}
+    return {
+        "results": collector.results,
+        "exit_code": int(exit_code),
+        "timings": timings,
+        "timed_out": budget.timed_out,
+    }
+
+
+def limit_cpu(seconds: int) -> None:
+    """Lets this process use at most ``seconds`` more CPU seconds (``SIGXCPU`` kills it).
+
+    Only the soft limit moves, so it can be raised again for the next
+    submission; the hard limit can never be raised back by the process.
+    """
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def worker_main(
+    conn,
+    tests_dir: str,
+    *,
+    memory_mb: int = 0,
+    cpu_seconds: int = 0,
+    test_wall_seconds: float = 0,
+    test_cpu_seconds: float = 0,
+    scratch_dir: str | None = None,
+    bytecode_dir: str | None = None,
+    bytecode_digests: Dict[str, str] | None = None,
+    fingerprint: Callable[[], str] | None = None,
+) -> None:
+    """Entry point of a pre-forked pool worker.
+
+    Warms pytest up, announces itself with the ``fingerprint()`` of the test
+    suite it imported (None if the suite changed while importing), then grades the ``(submission_path,
+    nodeids)`` jobs received over ``conn`` until it gets ``None``; ``nodeids``
+    is ``None`` for the whole suite or a shard of it. Every test report is
+    streamed back as ``("report", entry)`` before the final
+    ``("result", graded)``.
+    """
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    if resource is not None and memory_mb:
+        memory = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    tests_path = Path(tests_dir)
+    if bytecode_dir:
+        RewrittenTestCache(Path(bytecode_dir), bytecode_digests).install()
+    loaded = fingerprint() if fingerprint else None
+    nodeids = warm_up(tests_path)
+    if fingerprint and fingerprint() != loaded:
+        loaded = None
+    conn.send(("ready", {"pid": os.getpid(), "nodeids": nodeids, "fingerprint": loaded}))
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        submission_path, nodeids = message
+        limit_cpu(cpu_seconds)
+        graded = grade_submission(
+            submission_path,
+            tests_path,
+            lambda entry: conn.send(("report", entry)),
+            test_wall_seconds=test_wall_seconds,
+            test_cpu_seconds=test_cpu_seconds,
+            scratch_dir=scratch_dir,
+            nodeids=nodeids,
+        )
+        conn.send(("result", graded))
+
+
+def _emit(stream, kind: str, payload: dict) -> None:
+    stream.write(json.dumps([kind, payload], ensure_ascii=False))
+    stream.write("\n")
+    stream.flush()
+
+
+def main() -> int:
+    # Results travel on the original stdout as JSON lines (one per test
+    # report, then the final result); everything pytest or the student
+    # prints is pushed to stderr so it can't corrupt the stream.
+    result_stream = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("submission", nargs="?")
+    parser.add_argument("tests_dir", nargs="?")
+    parser.add_argument("--test-wall-seconds", type=float, default=0)
+    parser.add_argument("--test-cpu-seconds", type=float, default=0)
+    parser.add_argument("--scratch-dir")
+    parser.add_argument("--bytecode-dir")
+    # JSON {entry name: sha256} from a trusted --precompile run.
+    parser.add_argument("--bytecode-digests", type=json.loads, default=None)
+    parser.add_argument(
+        "--precompile",
+        metavar="TESTS_DIR",
+        help="rewrite the test modules into --bytecode-dir and print their digests instead of grading",
+    )
+    args = parser.parse_args()
+
+    if args.precompile:
+        if not args.bytecode_dir:
+            parser.error("--precompile needs --bytecode-dir")
+        digests = RewrittenTestCache(Path(args.bytecode_dir)).precompile(Path(args.precompile))
+        _emit(result_stream, "digests", digests)
+        return 0
+    if not args.submission or not args.tests_dir:
+        parser.error("submission and tests_dir are required")
+
+    if args.bytecode_dir:
+        RewrittenTestCache(Path(args.bytecode_dir), args.bytecode_digests).install()
+    _install_finder()
+    graded = grade_submission(
+        args.submission,
+        Path(args.tests_dir),
+        lambda entry: _emit(result_stream, "report", entry),
+        test_wall_seconds=args.test_wall_seconds,
+        test_cpu_seconds=args.test_cpu_seconds,
+        scratch_dir=args.scratch_dir,
+    )
+
+    _emit(result_stream, "result", graded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""Grading jobs shared by every API process.
+
+Jobs, their event history and the admission state live in one SQLite
+database (WAL mode), so the API can run as several processes
+(``uvicorn --workers N``) or containers sharing the submissions volume: any
+process can accept an upload, any process with a free grading slot claims
+the oldest queued job, and any process can answer status, trace and SSE
+requests for it.
+
+A job goes ``receiving`` (admitted, upload in progress) -> ``queued`` ->
+``running`` -> ``done`` / ``error``, or ``queued`` -> ``superseded`` when the
+same student submits again before it was claimed. Every state change that
+must be atomic across processes is a single ``BEGIN IMMEDIATE`` transaction.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import ContextManager, Iterable, List, Tuple
+
+from .admission import AdmissionRejected, take_token
+from .sqlite import connect, transaction
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    student TEXT NOT NULL,
+    student_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submission_id INTEGER,
+    sha256 TEXT,
+    admitted_at REAL NOT NULL,
+    queued_at REAL,
+    upload_seconds REAL,
+    claimed_at REAL,
+    owner TEXT,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    trace TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, queued_at);
+CREATE INDEX IF NOT EXISTS jobs_by_student ON jobs (student, status);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    student TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+ACTIVE_STATUSES = ("receiving", "queued", "running")
+FINISHED_STATUSES = ("done", "error", "superseded")
+
+_COLUMNS = (
+    "id, student, student_name, status, submission_id, sha256, admitted_at, queued_at, upload_seconds, "
+    "claimed_at, owner, finished_at, result, error, trace"
+)
+
+
+def _row(row) -> dict:
+    job = dict(zip(_COLUMNS.split(", "), row))
+    for key in ("result", "trace"):
+        if job[key] is not None:
+            job[key] = json.loads(job[key])
+    return job
+
+
+class JobQueue:
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        max_inflight: int,
+        retry_after: float,
+        rate_per_second: float,
+        burst: int,
+        stale_after: float,
+    ) -> None:
+        self.db_path = db_path
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        # A job still "running" (or "receiving") this long after it was
+        # claimed (or admitted) belongs to a process that died.
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def open(self) -> None:
+        self._db = connect(self.db_path, _SCHEMA)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _transaction(self) -> ContextManager[sqlite3.Connection]:
+        return transaction(self._db, self._lock)
+
+    def _append_event(self, db: sqlite3.Connection, job_id: str, event: str, data: dict) -> None:
+        db.execute(
+            "INSERT INTO job_events (job_id, seq, event, data) "
+            "SELECT ?, COALESCE(MAX(seq) + 1, 0), ?, ? FROM job_events WHERE job_id = ?",
+            (job_id, event, json.dumps(data, ensure_ascii=False), job_id),
+        )
+
+    # -- submitting ----------------------------------------------------------
+
+    def admit(self, student: str, student_name: str) -> str:
+        """Reserves a slot for a new submission of ``student`` and returns its job id.
+
+        Raises :class:`AdmissionRejected` when every slot is taken or the
+        student's token bucket is empty.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            placeholders = ", ".join("?" * len(ACTIVE_STATUSES))
+            (inflight,) = db.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({placeholders})", ACTIVE_STATUSES
+            ).fetchone()
+            if inflight >= self.max_inflight:
+                raise AdmissionRejected("busy", self.retry_after)
+            if self.rate_per_second > 0:
+                bucket = db.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE student = ?", (student,)
+                ).fetchone()
+                tokens, wait = take_token(
+                    *(bucket or (self.burst, now)), now, rate=self.rate_per_second, burst=self.burst
+                )
+                if wait:
+                    raise AdmissionRejected("rate_limited", wait)
+                db.execute(
+                    "INSERT INTO rate_buckets (student, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(student) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (student, tokens, now),
+                )
+            job_id = uuid.uuid4().hex
+            db.execute(
+                "INSERT INTO jobs (id, student, student_name, status, admitted_at) VALUES (?, ?, ?, 'receiving', ?)",
+                (job_id, student, student_name, now),
+            )
+        return job_id
+
+    def abandon(self, job_id: str) -> None:
+        """Gives back the slot of an admitted submission whose upload failed."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM jobs WHERE id = ? AND status = 'receiving'", (job_id,))
+
+    def enqueue(self, job_id: str, submission: dict, upload_seconds: float) -> List[str]:
+        """Queues a stored submission and supersedes the student's older queued jobs.
+
+        Returns the ids of the superseded jobs.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            (student,) = db.execute("SELECT student FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            superseded = [
+                row[0]
+                for row in db.execute(
+                    "UPDATE jobs SET status = 'superseded', finished_at = ? "
+                    "WHERE student = ? AND status = 'queued' RETURNING id",
+                    (now, student),
+                ).fetchall()
+            ]
+            for old_id in superseded:
+                self._append_event(db, old_id, "superseded", {"replaced_by": job_id})
+            db.execute(
+                "UPDATE jobs SET status = 'queued', submission_id = ?, sha256 = ?, queued_at = ?, upload_seconds = ? "
+                "WHERE id = ?",
+                (submission["id"], submission["sha256"], now, upload_seconds, job_id),
+            )
+        return superseded
+
+    # -- grading -------------------------------------------------------------
+
+    def claim(self, owner: str) -> dict | None:
+        """Marks the oldest queued job as running under ``owner`` and returns it."""
+        with self._transaction() as db:
+            row = db.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, claimed_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY queued_at LIMIT 1) "
+                f"RETURNING {_COLUMNS}",
+                (owner, time.time()),
+            ).fetchone()
+        return _row(row) if row is not None else None
+
+    def requeue(self, job_id: str) -> None:
+        """Puts a claimed job back at its place in the queue, dropping the events it published."""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, claimed_at = NULL "
+                "WHERE id = ? AND status = 'running'",
+                (job_id,),
+            )
+            db.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+
+    def publish(self, job_id: str, events: Iterable[Tuple[str, dict]]) -> None:
+        """Appends ``(event, data)`` pairs to a job's events, in order, in one transaction."""
+        with self._transaction() as db:
+            for event, data in events:
+                self._append_event(db, job_id, event, data)
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        event: str,
+        data: dict,
+        *,
+        result: dict | None = None,
+        error: str | None = None,
+        trace: dict | None = None,
+    ) -> None:
+        """Stores the outcome of a job and its final event in one transaction."""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, trace = ? WHERE id = ?",
+                (
+                    status,
+                    time.time(),
+                    None if result is None else json.dumps(result, ensure_ascii=False),
+                    error,
+                    None if trace is None else json.dumps(trace, ensure_ascii=False),
+                    job_id,
+                ),
+            )
+            self._append_event(db, job_id, event, data)
+
+    # -- reading -------------------------------------------------------------
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row(row) if row is not None else None
+
+    def events(self, job_id: str, since: int = 0) -> List[dict]:
+        """Events of a job from position ``since`` on, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq >= ? ORDER BY seq",
+                (job_id, since),
+            ).fetchall()
+        return [{"id": seq, "event": event, "data": json.loads(data)} for seq, event, data in rows]
+
+    def inflight(self) -> int:
+        placeholders = ", ".join("?" * len(ACTIVE_STATUSES))
+        with self._lock:
+            (count,) = self._db.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({placeholders})", ACTIVE_STATUSES
+            ).fetchone()
+        return count
+
+    # -- maintenance ---------------------------------------------------------
+
+    def prune(self, finished_before: float, *, error: str) -> List[str]:
+        """Drops jobs finished before ``finished_before`` and fails stale ones.
+
+        Stale running jobs are finished with ``error``; their ids are returned.
+        """
+        now = time.time()
+        stale_before = now - self.stale_after
+        with self._transaction() as db:
+            db.execute("DELETE FROM jobs WHERE status = 'receiving' AND admitted_at < ?", (stale_before,))
+            failed = [
+                row[0]
+                for row in db.execute(
+                    "UPDATE jobs SET status = 'error', error = ?, finished_at = ? "
+                    "WHERE status = 'running' AND claimed_at < ? RETURNING id",
+                    (error, now, stale_before),
+                ).fetchall()
+            ]
+            for job_id in failed:
+                self._append_event(db, job_id, "error", {"detail": error})
+            db.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)",
+                (finished_before,),
+            )
+            db.execute("DELETE FROM jobs WHERE finished_at < ?", (finished_before,))
+            if self.rate_per_second > 0:
+                # A bucket that has refilled completely is the same as no bucket.
+                db.execute(
+                    "DELETE FROM rate_buckets WHERE updated < ?", (now - self.burst / self.rate_per_second,)
+                )
+        return failed
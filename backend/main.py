@@ -1,23 +1,87 @@
-import importlib
+import asyncio
 import json
+import logging
+import math
 import os
-import shutil
+import socket
+import sqlite3
 import sys
 import tempfile
 import time
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
-import pytest
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+from . import scoring
+from .admission import AdmissionRejected
+from .analytics import AnalyticsStore
+from .cache import ResultCache, SuiteFingerprint
+from .config import (
+    BASE_DIR,
+    TESTS_DIR,
+    SUBMISSIONS_DIR,
+    LOG_FILE,
+    FAILURE_DB,
+    FAILURE_FLUSH_SECONDS,
+    GRADER_WORKERS,
+    GRADER_QUEUE_SIZE,
+    GRADER_RETRY_AFTER,
+    GRADER_MODE,
+    GRADER_CPU_SECONDS,
+    GRADER_WALL_SECONDS,
+    GRADER_MEMORY_MB,
+    GRADER_TEST_WALL_SECONDS,
+    GRADER_TEST_CPU_SECONDS,
+    GRADER_SCRATCH_DIR,
+    GRADER_BYTECODE_DIR,
+    GRADER_MAX_RUNS,
+    GRADER_MAX_SHARDS,
+    JOB_TTL_SECONDS,
+    GRADER_CACHE_SIZE,
+    GRADER_CACHE_DIR,
+    GRADER_CACHE_DISK_ENTRIES,
+    GRADER_MAX_UPLOAD_BYTES,
+    GRADER_TRACE_DIR,
+    GRADER_RATE_PER_MINUTE,
+    GRADER_RATE_BURST,
+    API_PROCESSES,
+    JOBS_DB,
+    GRADER_QUEUE_POLL_SECONDS,
+    JOB_PRUNE_SECONDS,
+    ANALYTICS_DB,
+    ANALYTICS_PASS_SCORE,
+    ANALYTICS_WINDOW_SECONDS,
+)
+from .failures import FailureStore
+from .jobqueue import FINISHED_STATUSES, JobQueue
+from .metrics import Registry
+from .pool import GRADER_SCRIPT, WorkerDied, WorkerPool, precompile_tests
+from .storage import SubmissionStore
+from .upload import SubmissionForm, UploadRejected, too_large_detail
+
 
+logger = logging.getLogger(__name__)
+
+# Room for the student_name field and the multipart boundaries.
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+_CHILD_ENV = {
+    "PATH": os.environ.get("PATH", ""),
+    "PYTHONDONTWRITEBYTECODE": "1",
+    "PYTHONIOENCODING": "utf-8",
+}
+_CHILD_LINE_LIMIT = 4 * 1024 * 1024
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-TESTS_DIR = BASE_DIR / "tests"
-SUBMISSIONS_DIR = BASE_DIR / "submissions"
-LOG_FILE = BASE_DIR / "backend" / "failure_log.json"
+TIMEOUT_FEEDBACK = "El test superó el tiempo límite: revisá bucles infinitos o algoritmos demasiado lentos."
 
 FEEDBACK_MAP = {
     "tests/test_bookbyte_catalogo.py::test_agregar_y_buscar": "Asegurate de que Catalogo.buscar devuelva el mismo objeto que se agregó y None cuando el código no existe.",
@@ -39,9 +103,143 @@ FEEDBACK_MAP = {
     "tests/test_bookbyte_products.py::test_imponible_iva": "Implementá precio_con_iva multiplicando por 1.21 para los productos imponibles.",
 }
 
-SUBMISSIONS_DIR.mkdir(exist_ok=True)
+_grading_pool: WorkerPool | None = None
+# Digests of the precompiled test modules, for the sandboxed children
+# (GRADER_MODE=subprocess); pool workers get theirs from the pool.
+_bytecode_digests: Dict[str, str] = {}
+_bytecode_suite: str | None = None
+_bytecode_lock = asyncio.Lock()
+_job_queue = JobQueue(
+    JOBS_DB,
+    max_inflight=GRADER_WORKERS * API_PROCESSES + GRADER_QUEUE_SIZE,
+    retry_after=GRADER_RETRY_AFTER,
+    rate_per_second=GRADER_RATE_PER_MINUTE / 60,
+    burst=GRADER_RATE_BURST,
+    # A live owner finishes (or kills) every job within its wall-clock limit.
+    stale_after=2 * GRADER_WALL_SECONDS + 60,
+)
+_analytics = AnalyticsStore(ANALYTICS_DB, pass_score=ANALYTICS_PASS_SCORE)
+_suite_fingerprint = SuiteFingerprint(TESTS_DIR)
+_result_cache = ResultCache(
+    GRADER_CACHE_SIZE,
+    Path(GRADER_CACHE_DIR) if GRADER_CACHE_DIR else None,
+    max_disk_entries=GRADER_CACHE_DISK_ENTRIES,
+)
 
-app = FastAPI(title="Exam Autograder")
+_metrics = Registry()
+_stage_seconds = _metrics.histogram(
+    "grader_stage_seconds",
+    "Seconds spent per grading stage (upload, queue_wait, staging, startup, collection, execution, "
+    "failure_log, total).",
+    ["stage"],
+)
+_test_seconds = _metrics.histogram(
+    "grader_test_duration_seconds", "Duration of each official test, from the pytest report.", ["nodeid"]
+)
+_jobs_finished = _metrics.counter("grader_jobs_total", "Finished grading jobs by outcome.", ["outcome"])
+_submissions_rejected = _metrics.counter(
+    "grader_submissions_rejected_total", "Submissions refused by admission control.", ["reason"]
+)
+_metrics.gauge("grader_jobs_inflight", "Jobs queued or being graded, by every process.", function=_job_queue.inflight)
+_metrics.gauge("grader_workers", "Grading workers (or subprocess slots).", function=lambda: GRADER_WORKERS)
+_workers_busy = _metrics.gauge("grader_workers_busy", "Workers currently grading a submission.")
+_workers_busy.set(0)
+_worker_busy_seconds = _metrics.counter(
+    "grader_worker_busy_seconds_total",
+    "Seconds workers spent grading; rate() of it over grader_workers is the utilization.",
+)
+_metrics.counter("grader_cache_hits_total", "Result-cache hits.", function=lambda: _result_cache.hits)
+_metrics.counter("grader_cache_misses_total", "Result-cache misses.", function=lambda: _result_cache.misses)
+_metrics.gauge("grader_failure_log_version", "Version of the failure counters.", function=lambda: _failure_store.version)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _grading_pool
+    # The old failure_log.json is imported once into the SQLite store.
+    await asyncio.to_thread(_failure_store.open, LOG_FILE)
+    await asyncio.to_thread(_submission_store.open)
+    # Files from the old flat <timestamp>_<student>.py layout move into the store.
+    await asyncio.to_thread(_submission_store.import_legacy, SUBMISSIONS_DIR)
+    await asyncio.to_thread(_job_queue.open)
+    await asyncio.to_thread(_analytics.open)
+    loop = asyncio.get_running_loop()
+    flusher = loop.create_task(_flush_failures_periodically())
+    pruner = loop.create_task(_prune_jobs_periodically())
+    if GRADER_MODE == "pool":
+        _grading_pool = WorkerPool(
+            GRADER_WORKERS,
+            TESTS_DIR,
+            max_runs=GRADER_MAX_RUNS,
+            memory_mb=GRADER_MEMORY_MB,
+            wall_seconds=GRADER_WALL_SECONDS,
+            cpu_seconds=GRADER_CPU_SECONDS,
+            test_wall_seconds=GRADER_TEST_WALL_SECONDS,
+            test_cpu_seconds=GRADER_TEST_CPU_SECONDS,
+            scratch_dir=GRADER_SCRATCH_DIR,
+            bytecode_dir=GRADER_BYTECODE_DIR,
+        )
+    # The API answers (and /healthz reports "starting") while the workers
+    # import pytest and the tests; jobs are claimed once one of them is warm.
+    warming = loop.create_task(_warm_up_pool())
+    dispatcher = loop.create_task(_dispatch_jobs())
+    try:
+        yield
+    finally:
+        warming.cancel()
+        dispatcher.cancel()
+        # Jobs still grading here go back to the shared queue for another process.
+        for task in list(_job_tasks):
+            task.cancel()
+        await asyncio.gather(dispatcher, *_job_tasks, return_exceptions=True)
+        if _grading_pool is not None:
+            await _grading_pool.close()
+            _grading_pool = None
+        flusher.cancel()
+        pruner.cancel()
+        await asyncio.to_thread(_failure_store.close)
+        await asyncio.to_thread(_job_queue.close)
+        await asyncio.to_thread(_analytics.close)
+        await asyncio.to_thread(_submission_store.close)
+
+
+class UploadSizeLimitMiddleware:
+    """Refuses a submission whose declared ``Content-Length`` is over the limit, before reading it.
+
+    Only a cheap pre-check: the cap itself is enforced on the file part by
+    :class:`SubmissionForm` as the body streams in, chunked bodies included.
+    """
+
+    def __init__(self, app, *, path: str, max_body_bytes: int) -> None:
+        self.app = app
+        self.path = path
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        # The upload stage starts when the request arrives, before the body is parsed.
+        scope.setdefault("state", {})["received_at"] = time.perf_counter()
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body_bytes:
+            response = JSONResponse({"detail": _upload_too_large_detail()}, status_code=413)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def _upload_too_large_detail() -> str:
+    return too_large_detail(GRADER_MAX_UPLOAD_BYTES)
+
+
+app = FastAPI(title="Exam Autograder", lifespan=lifespan)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path="/api/submit",
+    max_body_bytes=GRADER_MAX_UPLOAD_BYTES + _FORM_OVERHEAD_BYTES,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -55,159 +253,726 @@ def _slugify(value: str) -> str:
     return "".join(ch.lower() if ch.isalnum() else "-" for ch in value).strip("-") or "student"
 
 
-class PytestResultCollector:
+def _build_feedback(nodeid: str) -> str:
+    return FEEDBACK_MAP.get(nodeid, "")
+
+
+_failure_store = FailureStore(FAILURE_DB, FAILURE_DB.with_suffix(".journal"), _build_feedback)
+_submission_store = SubmissionStore(SUBMISSIONS_DIR)
+
+
+async def _flush_failures_periodically() -> None:
+    while True:
+        await asyncio.sleep(FAILURE_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(_failure_store.flush)
+        except Exception:
+            logger.exception("Could not flush the failure log")
+
+
+def _limit_child_resources() -> None:
+    """Applied in the grading child right before exec (subprocess mode)."""
+    if resource is None:
+        return
+    cpu = GRADER_CPU_SECONDS
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    memory = GRADER_MEMORY_MB * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+async def _grade_in_subprocess(submission_path: Path, on_report: scoring.ReportCallback | None = None) -> dict:
+    """Grades a submission in a short-lived, resource-limited child process.
+
+    The child reads the shared ``tests/`` in place and imports the stored
+    submission through the grader's import hook, so nothing is copied per
+    job. ``-B`` keeps it from writing bytecode next to the shared tests.
+    """
+    spawned = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-I",
+        "-B",
+        str(GRADER_SCRIPT),
+        str(submission_path),
+        str(TESTS_DIR),
+        "--test-wall-seconds",
+        str(GRADER_TEST_WALL_SECONDS),
+        "--test-cpu-seconds",
+        str(GRADER_TEST_CPU_SECONDS),
+        *(["--scratch-dir", GRADER_SCRATCH_DIR] if GRADER_SCRATCH_DIR else []),
+        "--bytecode-dir",
+        GRADER_BYTECODE_DIR,
+        "--bytecode-digests",
+        json.dumps(_bytecode_digests),
+        cwd=GRADER_SCRATCH_DIR or tempfile.gettempdir(),
+        env=_CHILD_ENV,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        preexec_fn=_limit_child_resources,
+        limit=_CHILD_LINE_LIMIT,
+    )
+
+    async def read_stream() -> dict | None:
+        graded = None
+        async for line in proc.stdout:
+            try:
+                kind, payload = json.loads(line)
+            except ValueError:
+                continue
+            if kind == "result":
+                graded = payload
+            elif on_report is not None:
+                on_report(payload)
+        await proc.wait()
+        return graded
+
+    try:
+        graded = await asyncio.wait_for(read_stream(), timeout=GRADER_WALL_SECONDS)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return scoring.sandbox_failure(f"La corrección superó el límite de {GRADER_WALL_SECONDS:g} segundos")
+
+    if graded is None:
+        return scoring.sandbox_failure(
+            f"El proceso de corrección terminó inesperadamente (código {proc.returncode}); "
+            "revisá bucles infinitos o uso excesivo de memoria"
+        )
+    timings = graded.setdefault("timings", {})
+    # Interpreter start-up and importing pytest, which warm workers skip.
+    timings["startup"] = max(0.0, time.perf_counter() - spawned - sum(timings.values()))
+    return graded
+
+
+def _sanitize_result(item: dict) -> dict:
+    entry = {"nodeid": item["nodeid"], "outcome": item["outcome"]}
+    phase = item.get("phase")
+    if phase:
+        entry["phase"] = phase
+    if item["outcome"] == "timeout":
+        entry["feedback"] = TIMEOUT_FEEDBACK
+    elif item["outcome"] != "passed":
+        feedback = _build_feedback(item["nodeid"])
+        if feedback:
+            entry["feedback"] = feedback
+    return entry
+
+
+class _Signal:
+    """Wakes the coroutines of this process waiting for a change in the shared queue.
+
+    Other processes cannot notify it, so waiters also give up after a short
+    timeout and poll the queue again.
+    """
+
     def __init__(self) -> None:
-        self.results: List[dict] = []
-
-    def _append_report(self, *, nodeid: str, outcome: str, message: str | None, phase: str) -> None:
-        entry = {"nodeid": nodeid, "outcome": outcome}
-        if phase != "call":
-            entry["phase"] = phase
-        if message:
-            entry["message"] = message
-        self.results.append(entry)
-
-    def pytest_runtest_logreport(self, report):  # type: ignore[override]
-        if report.when != "call" and report.passed:
+        self.version = 0
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        self.version += 1
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, seen: int, timeout: float) -> None:
+        if self.version != seen:
             return
-        message = str(report.longrepr) if report.failed and report.longrepr else None
-        self._append_report(
-            nodeid=report.nodeid,
-            outcome=report.outcome,
-            message=message,
-            phase=report.when,
-        )
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._event.wait(), timeout)
+
+
+class Job:
+    """A job this process claimed from the shared queue and is grading."""
+
+    def __init__(self, row: dict) -> None:
+        self.id = row["id"]
+        self.student = row["student_name"]
+        self.student_key = row["student"]
+        self.submission_id = row["submission_id"]
+        self.digest = row["sha256"]
+        self.stored_path = _submission_store.blob_path(self.digest)
+        self.stored_name = _stored_name(self.digest)
+        self.status = row["status"]
+        self.result: dict | None = None
+        self.error: str | None = None
+        # Wall-clock time: the job may have been queued by another process.
+        self.queued_at = row["queued_at"]
+        self.started: float | None = None
+        self.workers = 0
+        # The upload stage was observed by the process that received it.
+        self.stages: Dict[str, float] = {"upload": row["upload_seconds"] or 0.0}
+        self.test_durations: List[dict] = []
+        self.cached = False
+        self._unpublished: List[Tuple[str, dict]] = []
+        self._publisher: asyncio.Task | None = None
+
+    def publish(self, event: str, data: dict) -> None:
+        """Queues an event for the shared queue.
+
+        One background task writes the queued events in order, off the event
+        loop; reports that arrive while it writes go in its next transaction.
+        """
+        self._unpublished.append((event, data))
+        if self._publisher is None or self._publisher.done():
+            self._publisher = asyncio.get_running_loop().create_task(self._publish_pending())
+
+    async def _publish_pending(self) -> None:
+        while self._unpublished:
+            events, self._unpublished = self._unpublished, []
+            try:
+                await asyncio.to_thread(_job_queue.publish, self.id, events)
+            except sqlite3.Error:
+                logger.exception("Could not publish the events of job %s", self.id)
+            _job_events.notify()
+
+    async def published(self, *, discard: bool = False) -> None:
+        """Waits for the events being written; with ``discard``, drops those still queued."""
+        if discard:
+            self._unpublished.clear()
+        if self._publisher is not None:
+            await self._publisher
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = seconds
+        _stage_seconds.observe(seconds, stage=stage)
+
+    def trace(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stored_file": self.stored_name,
+            "cached": self.cached,
+            "workers": self.workers,
+            "stages": {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            "tests": self.test_durations,
+        }
 
-    def pytest_collectreport(self, report):  # type: ignore[override]
-        if report.failed:
-            message = str(report.longrepr) if report.longrepr else None
-            nodeid = getattr(report, "nodeid", None) or str(report.fspath)
-            self._append_report(
-                nodeid=nodeid,
-                outcome="failed",
-                message=message,
-                phase="collect",
-            )
 
+def _stored_name(digest: str | None) -> str | None:
+    if digest is None:
+        return None
+    return _submission_store.blob_path(digest).relative_to(SUBMISSIONS_DIR).as_posix()
+
+
+def _snapshot(row: dict) -> dict:
+    data = {
+        "job_id": row["id"],
+        "status": row["status"],
+        "student": row["student_name"],
+        "stored_file": _stored_name(row["sha256"]),
+        "submission_id": row["submission_id"],
+    }
+    if row["result"] is not None:
+        data["result"] = row["result"]
+    if row["error"] is not None:
+        data["error"] = row["error"]
+    return data
 
-class ChangeCwd:
-    def __init__(self, new_cwd: Path) -> None:
-        self.new_cwd = new_cwd
-        self.old_cwd = Path.cwd()
 
-    def __enter__(self):
-        os.chdir(self.new_cwd)
+INTERNAL_ERROR = "Error interno al corregir la entrega"
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        os.chdir(self.old_cwd)
+# Identifies this process as the owner of the jobs it claims.
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_jobs: Dict[str, Job] = {}
+_job_tasks: set = set()
+_jobs_queued = _Signal()
+_job_events = _Signal()
 
 
-def _load_failure_log() -> dict:
-    if LOG_FILE.exists():
+async def _refresh_bytecode(fingerprint: str) -> None:
+    """Precompiles the tests again for the sandboxed children when the suite changed."""
+    global _bytecode_digests, _bytecode_suite
+    # Concurrent jobs wait for the one precompiling instead of launching
+    # children with the digests of the previous suite.
+    async with _bytecode_lock:
+        if fingerprint == _bytecode_suite:
+            return
+        _bytecode_digests = await precompile_tests(TESTS_DIR, GRADER_BYTECODE_DIR)
+        _bytecode_suite = fingerprint
+
+
+async def _warm_up_pool() -> None:
+    if _grading_pool is None:
+        if GRADER_MODE == "subprocess":
+            await _refresh_bytecode(await asyncio.to_thread(_suite_fingerprint.current))
+        return
+    started = time.perf_counter()
+    try:
+        await _grading_pool.start()
+    except WorkerDied:
+        logger.exception("Some grading workers failed to start")
+    logger.info("%d grading workers ready in %.2f s", _grading_pool.ready, time.perf_counter() - started)
+
+
+async def _dispatch_jobs() -> None:
+    """Claims queued jobs from the shared queue while this process has a free grading slot."""
+    if _grading_pool is not None:
+        await _grading_pool.wait_warm()
+    slots = asyncio.Semaphore(GRADER_WORKERS)
+    while True:
+        await slots.acquire()
+        seen = _jobs_queued.version
         try:
-            data = json.loads(LOG_FILE.read_text(encoding="utf-8"))
-            failures = data.get("failures")
-            if isinstance(failures, dict):
-                for info in failures.values():
-                    if "last_feedback" not in info and "last_message" in info:
-                        info["last_feedback"] = info["last_message"]
-            return data
-        except json.JSONDecodeError:
-            pass
-    return {"failures": {}}
+            row = await asyncio.to_thread(_job_queue.claim, _OWNER)
+        except sqlite3.Error:
+            logger.exception("Could not claim a job from the queue")
+            row = None
+        if row is None:
+            slots.release()
+            await _jobs_queued.wait(seen, GRADER_QUEUE_POLL_SECONDS)
+            continue
+        job = Job(row)
+        _jobs[job.id] = job
+        task = asyncio.get_running_loop().create_task(_run_job(job))
+        _job_tasks.add(task)
+        task.add_done_callback(_job_tasks.discard)
+        task.add_done_callback(lambda _: slots.release())
 
 
-def _build_feedback(nodeid: str) -> str:
-    return FEEDBACK_MAP.get(nodeid, "")
+async def _prune_jobs_periodically() -> None:
+    while True:
+        await asyncio.sleep(JOB_PRUNE_SECONDS)
+        try:
+            failed = await asyncio.to_thread(
+                _job_queue.prune, time.time() - JOB_TTL_SECONDS, error=INTERNAL_ERROR
+            )
+        except sqlite3.Error:
+            logger.exception("Could not prune the job queue")
+            continue
+        if failed:
+            logger.warning("Failed %d jobs abandoned by a dead process", len(failed))
+            _jobs_finished.inc(len(failed), outcome="error")
+            _job_events.notify()
+        try:
+            await asyncio.to_thread(_analytics.prune, time.time() - ANALYTICS_WINDOW_SECONDS)
+        except sqlite3.Error:
+            logger.exception("Could not prune the analytics")
+
+
+async def _build_result(job: Job, graded: dict, *, cached: bool) -> dict:
+    results = graded["results"]
+    summary = scoring.summarize(results)
+    failed = summary["failed"]
+
+    started = time.perf_counter()
+    log_snapshot = await asyncio.to_thread(_failure_store.record, scoring.failing_nodeids(results))
+    job.record_stage("failure_log", time.perf_counter() - started)
+
+    return {
+        "student": job.student,
+        "stored_file": job.stored_name,
+        "score": summary["score"],
+        "total_tests": summary["total_tests"],
+        "passed": summary["passed"],
+        "failed": len(failed),
+        "results": [_sanitize_result(item) for item in results],
+        "failure_log": log_snapshot,
+        "exit_code": graded["exit_code"],
+        "cached": cached,
+    }
+
+
+def _record_grading(job: Job, graded: dict) -> None:
+    for stage in ("staging", "startup", "collection", "execution"):
+        seconds = graded.get("timings", {}).get(stage)
+        if seconds is not None:
+            job.record_stage(stage, seconds)
+    for item in graded["results"]:
+        if "duration" in item and item.get("phase", "call") == "call":
+            _test_seconds.observe(item["duration"], nodeid=item["nodeid"])
+            job.test_durations.append(
+                {"nodeid": item["nodeid"], "outcome": item["outcome"], "duration": item["duration"]}
+            )
 
 
-def _update_failure_log(failed_results: List[dict]) -> dict:
-    data = _load_failure_log()
-    failures = data.setdefault("failures", {})
-    for item in failed_results:
-        node = item["nodeid"]
-        entry = failures.setdefault(node, {"count": 0, "last_feedback": ""})
-        entry["count"] += 1
-        entry["last_feedback"] = _build_feedback(node)
-    LOG_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
-    return data
+def _write_trace(job: Job) -> None:
+    trace_dir = Path(GRADER_TRACE_DIR)
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    (trace_dir / f"{job.id}.json").write_text(json.dumps(job.trace(), ensure_ascii=False), encoding="utf-8")
+
+
+async def _run_job(job: Job) -> None:
+    def on_report(item: dict) -> None:
+        job.publish("report", _sanitize_result(item))
+
+    def on_start(workers: int = 1) -> None:
+        job.started = time.perf_counter()
+        job.workers = workers
+        job.record_stage("queue_wait", max(0.0, time.time() - job.queued_at))
+        _workers_busy.inc(workers)
+        job.publish("status", {"status": job.status})
+
+    outcome = "error"
+    interrupted = False
+    try:
+        fingerprint = await asyncio.to_thread(_suite_fingerprint.current)
+        # With GRADER_CACHE_DIR these read, write and prune files.
+        graded = await asyncio.to_thread(_result_cache.get, fingerprint, job.digest)
+        if graded is not None:
+            job.cached = True
+            for item in graded["results"]:
+                on_report(item)
+            job.result = await _build_result(job, graded, cached=True)
+            job.status = "done"
+            outcome = "cached"
+            return
 
+        try:
+            if GRADER_MODE == "subprocess":
+                await _refresh_bytecode(fingerprint)
+                on_start()
+                graded = await _grade_in_subprocess(job.stored_path, on_report)
+            else:
+                graded = await _grading_pool.grade(
+                    job.stored_path, on_report, on_start, max_shards=GRADER_MAX_SHARDS
+                )
+        finally:
+            if job.started is not None:
+                _workers_busy.dec(job.workers)
+                _worker_busy_seconds.inc((time.perf_counter() - job.started) * job.workers)
+        _record_grading(job, graded)
+        # Pool workers report the suite they imported; a sandboxed child
+        # imports it fresh, so only a change during the run can make it differ.
+        loaded = graded.pop("fingerprint", fingerprint)
+        if graded["exit_code"] >= 0 and not graded.get("timed_out"):
+            # Sandbox failures and test timeouts depend on load, not content;
+            # a result graded against a suite that is no longer current is
+            # shown but not cached.
+            if loaded == await asyncio.to_thread(_suite_fingerprint.current):
+                await asyncio.to_thread(_result_cache.put, loaded, job.digest, graded)
+            outcome = "graded"
+        else:
+            outcome = "sandbox_failure"
+        job.result = await _build_result(job, graded, cached=False)
+        job.status = "done"
+    except asyncio.CancelledError:
+        # This process is shutting down; the job goes back to the queue.
+        interrupted = True
+        raise
+    except Exception:
+        logger.exception("Grading job %s failed", job.id)
+        job.error = INTERNAL_ERROR
+        job.status = "error"
+    finally:
+        _jobs.pop(job.id, None)
+        if interrupted:
+            # Its events are dropped anyway; none may land after the requeue.
+            await job.published(discard=True)
+            await asyncio.to_thread(_job_queue.requeue, job.id)
+            _jobs_queued.notify()
+        else:
+            job.record_stage("total", job.stages["upload"] + max(0.0, time.time() - job.queued_at))
+            _jobs_finished.inc(outcome=outcome)
+            # The final event goes after every report.
+            await job.published()
+            await _finish_job(job)
+
+
+async def _finish_job(job: Job) -> None:
+    """Stores the outcome in the shared queue (final ``done``/``error`` event included), the score and the analytics."""
+    try:
+        if job.status == "done":
+            await asyncio.to_thread(
+                _job_queue.finish, job.id, "done", "done", job.result, result=job.result, trace=job.trace()
+            )
+        else:
+            await asyncio.to_thread(
+                _job_queue.finish, job.id, "error", "error", {"detail": job.error}, error=job.error, trace=job.trace()
+            )
+    except sqlite3.Error:
+        logger.exception("Could not store the outcome of job %s", job.id)
+    _job_events.notify()
+    if job.result is not None:
+        try:
+            await asyncio.to_thread(_submission_store.set_score, job.submission_id, job.result["score"])
+        except sqlite3.Error:
+            logger.exception("Could not store the score of submission %s", job.submission_id)
+        try:
+            await asyncio.to_thread(_record_analytics, job)
+        except sqlite3.Error:
+            logger.exception("Could not update the analytics with job %s", job.id)
+    if GRADER_TRACE_DIR:
+        try:
+            await asyncio.to_thread(_write_trace, job)
+        except OSError:
+            logger.exception("Could not write the trace of job %s", job.id)
+
+
+def _record_analytics(job: Job) -> None:
+    results = job.result["results"]
+    _analytics.record(
+        job.student_key,
+        job.student,
+        job.queued_at,
+        job.result["score"],
+        (item for item in results if item.get("phase", "call") == "call"),
+        scoring.failing_nodeids(results),
+        sandbox_failure=scoring.is_sandbox_failure(results),
+    )
 
-def _reset_pytest_state() -> None:
-    temp_dir = tempfile.gettempdir()
-    for name, module in list(sys.modules.items()):
-        path = getattr(module, "__file__", None)
-        if not path:
-            continue
-        if path.startswith(temp_dir) or path.endswith("bookbyte.py"):
-            sys.modules.pop(name, None)
-    sys.modules.pop("bookbyte", None)
-    importlib.invalidate_caches()
+
+_SUBMIT_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["student_name", "file"],
+                    "properties": {
+                        "student_name": {"type": "string"},
+                        "file": {"type": "string", "format": "binary"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+async def _admit(student_name: str) -> str:
+    try:
+        return await asyncio.to_thread(_job_queue.admit, _slugify(student_name), student_name)
+    except AdmissionRejected as rejected:
+        _submissions_rejected.inc(reason=rejected.reason)
+        raise _admission_error(rejected) from None
+
+
+async def _receive_submission(request: Request) -> Tuple[str, dict]:
+    """Parses the form as it arrives, admits it and stores the file; returns the job id and the index record.
+
+    Admission happens as soon as the student name and the file's headers
+    are in, so a refused student does not upload the rest of the file.
+    """
+    try:
+        form = SubmissionForm(
+            request.headers.get("content-type", ""),
+            _submission_store.incoming_dir,
+            max_file_bytes=GRADER_MAX_UPLOAD_BYTES,
+            max_field_bytes=_FORM_OVERHEAD_BYTES,
+        )
+    except UploadRejected as rejected:
+        raise HTTPException(status_code=rejected.status_code, detail=rejected.detail) from None
+    job_id = None
+    try:
+        try:
+            async for chunk in request.stream():
+                form.feed(chunk)
+                if job_id is None and form.ready:
+                    job_id = await _admit(form.student_name)
+            form.finish()
+        except UploadRejected as rejected:
+            raise HTTPException(status_code=rejected.status_code, detail=rejected.detail) from None
+        if job_id is None:
+            job_id = await _admit(form.student_name)
+        student_name = form.student_name
+        submission = await asyncio.to_thread(
+            _submission_store.add, form.path, form.digest, _slugify(student_name), student_name
+        )
+    except BaseException:
+        form.discard()
+        if job_id is not None:
+            await asyncio.to_thread(_job_queue.abandon, job_id)
+        raise
+    return job_id, submission
 
 
-@app.post("/api/submit")
-async def submit_exam(student_name: str = Form(...), file: UploadFile = File(...)):
+@app.post("/api/submit", status_code=202, openapi_extra=_SUBMIT_FORM)
+async def submit_exam(request: Request):
+    received = getattr(request.state, "received_at", None) or time.perf_counter()
     if not TESTS_DIR.exists():
         raise HTTPException(status_code=500, detail="Test suite not found on server")
 
-    filename = Path(file.filename or "")
-    if filename.suffix != ".py":
-        raise HTTPException(status_code=400, detail="Solo se aceptan archivos .py")
-
-    safe_name = _slugify(student_name)
-    timestamp = int(time.time())
-    stored_name = f"{timestamp}_{safe_name}{filename.suffix}"
-    stored_path = SUBMISSIONS_DIR / stored_name
-
-    content = await file.read()
-    stored_path.write_bytes(content)
-
-    with tempfile.TemporaryDirectory() as tmp:
-        tmp_path = Path(tmp)
-        shutil.copytree(TESTS_DIR, tmp_path / "tests")
-        shutil.copyfile(stored_path, tmp_path / "bookbyte.py")
-
-        _reset_pytest_state()
-        collector = PytestResultCollector()
-
-        with ChangeCwd(tmp_path):
-            exit_code = pytest.main(["-q", "tests", "--maxfail=0"], plugins=[collector])
-
-    test_reports = [r for r in collector.results if r.get("phase", "call") == "call"]
-    total = len(test_reports)
-    passed = sum(1 for r in test_reports if r["outcome"] == "passed")
-    failed = [r for r in collector.results if r["outcome"] != "passed"]
-    score = 100.0 * passed / total if total else 0.0
-
-    log_snapshot = _update_failure_log(failed)
-
-    sanitized_results = []
-    for item in collector.results:
-        entry = {"nodeid": item["nodeid"], "outcome": item["outcome"]}
-        phase = item.get("phase")
-        if phase:
-            entry["phase"] = phase
-        if item["outcome"] != "passed":
-            feedback = _build_feedback(item["nodeid"])
-            if feedback:
-                entry["feedback"] = feedback
-        sanitized_results.append(entry)
-
-    return JSONResponse(
-        {
-            "student": student_name,
-            "stored_file": stored_name,
-            "score": round(score, 2),
-            "total_tests": total,
-            "passed": passed,
-            "failed": len(failed),
-            "results": sanitized_results,
-            "failure_log": log_snapshot,
-            "exit_code": exit_code,
-        }
+    job_id, submission = await _receive_submission(request)
+    upload_seconds = time.perf_counter() - received
+    _stage_seconds.observe(upload_seconds, stage="upload")
+
+    # Only the latest file a student has waiting in the queue is graded.
+    superseded = await asyncio.to_thread(_job_queue.enqueue, job_id, submission, upload_seconds)
+    _jobs_queued.notify()
+    body = {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+    }
+    if superseded:
+        _jobs_finished.inc(len(superseded), outcome="superseded")
+        _job_events.notify()
+        body["supersedes"] = superseded[-1]
+    return JSONResponse(body, status_code=202)
+
+
+def _admission_error(rejected: AdmissionRejected) -> HTTPException:
+    retry_after = str(max(1, math.ceil(rejected.retry_after)))
+    if rejected.reason == "rate_limited":
+        return HTTPException(
+            status_code=429,
+            detail=f"Enviaste demasiadas entregas seguidas, esperá {retry_after} segundos antes de reintentar",
+            headers={"Retry-After": retry_after},
+        )
+    return HTTPException(
+        status_code=503,
+        detail="El servidor está ocupado corrigiendo otros exámenes, reintentá en unos segundos",
+        headers={"Retry-After": retry_after},
+    )
+
+
+async def _get_job(job_id: str) -> dict:
+    row = await asyncio.to_thread(_job_queue.get, job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="No existe la corrección solicitada")
+    return row
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    return JSONResponse(_snapshot(await _get_job(job_id)))
+
+
+@app.get("/api/students/{student_name}/submissions")
+async def get_student_history(student_name: str, limit: int | None = None):
+    """Every attempt of one student, newest first, with its score once graded."""
+    # SQLite reads a negative LIMIT as no limit at all.
+    if limit is not None and limit < 0:
+        raise HTTPException(status_code=400, detail="limit no puede ser negativo")
+    student = _slugify(student_name)
+    history = await asyncio.to_thread(_submission_store.history, student, limit)
+    return JSONResponse({"student": student, "submissions": history})
+
+
+@app.get("/api/jobs/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """Per-stage durations (seconds) and per-test durations of one job."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        return JSONResponse(job.trace())
+    row = await _get_job(job_id)
+    trace = row["trace"] or {
+        "job_id": row["id"],
+        "status": row["status"],
+        "stored_file": _stored_name(row["sha256"]),
+        "stages": {},
+        "tests": [],
+    }
+    return JSONResponse(trace)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """Server-sent events: one ``report`` per test, then ``done``, ``error`` or ``superseded``.
+
+    Event ids are positions in the job history, so a reconnecting
+    ``EventSource`` resumes where it left off via ``Last-Event-ID``. The
+    job may be graded by another process: events are read from the shared
+    queue, woken up right away by local jobs and polled otherwise.
+    """
+    await _get_job(job_id)
+    try:
+        seen = int(request.headers.get("last-event-id", "-1")) + 1
+    except ValueError:
+        seen = 0
+
+    def poll(since: int):
+        # The status is read first: once it is final, every event is stored.
+        row = _job_queue.get(job_id)
+        return row, _job_queue.events(job_id, since)
+
+    async def event_stream():
+        nonlocal seen
+        while True:
+            version = _job_events.version
+            row, events = await asyncio.to_thread(poll, seen)
+            for event in events:
+                payload = json.dumps(event["data"], ensure_ascii=False)
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {payload}\n\n"
+                seen = event["id"] + 1
+            if row is None or row["status"] in FINISHED_STATUSES:
+                return
+            await _job_events.wait(version, GRADER_QUEUE_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+_logs_body: tuple = ("", b"")
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @app.get("/api/logs")
-async def get_failure_log():
-    return JSONResponse(_load_failure_log())
+async def get_failure_log(request: Request, since: int | None = None):
+    """Aggregated failure counters, served from memory.
+
+    Supports ``If-None-Match`` (304 while nothing changed) and
+    ``?since=<version>`` to receive only the counters that changed after
+    the ``version`` returned by a previous call.
+    """
+    global _logs_body
+    etag = _failure_store.etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if since is not None:
+        return JSONResponse(_failure_store.changes_since(since), headers=headers)
+    if _logs_body[0] != etag:
+        _logs_body = (etag, json.dumps(_failure_store.snapshot(), ensure_ascii=False).encode("utf-8"))
+    return Response(content=_logs_body[1], media_type="application/json", headers=headers)
+
+
+@app.get("/api/analytics")
+async def get_analytics(window: int = 3600, top: int = 10):
+    """Instructor dashboard: score histogram, pass rate per test, attempts,
+    time to first pass and the tests failing most in the last ``window`` seconds.
+
+    Served from aggregates kept up to date as submissions are graded.
+    """
+    if not 0 < window <= ANALYTICS_WINDOW_SECONDS:
+        raise HTTPException(status_code=400, detail=f"window debe estar entre 1 y {ANALYTICS_WINDOW_SECONDS} segundos")
+    if not 0 < top <= 100:
+        raise HTTPException(status_code=400, detail="top debe estar entre 1 y 100")
+    return await asyncio.to_thread(_analytics.summary, window_seconds=window, top=top)
+
+
+@app.get("/api/analytics/students")
+async def get_analytics_students(limit: int = 50, offset: int = 0):
+    """Attempts, scores and time to first pass of each student, most attempts first."""
+    if not 0 < limit <= 500 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit debe estar entre 1 y 500 y offset no puede ser negativo")
+    return {"students": await asyncio.to_thread(_analytics.students, limit=limit, offset=offset)}
+
+
+@app.get("/healthz")
+async def healthz():
+    """Readiness of this process: 200 once it can grade, 503 while its workers warm up.
+
+    Touches neither SQLite nor pytest, so it is cheap enough for tight
+    health-check loops.
+    """
+    if _grading_pool is not None:
+        ready = _grading_pool.ready
+    else:
+        # Sandboxed children need no warm-up.
+        ready = GRADER_WORKERS if GRADER_MODE == "subprocess" else 0
+    body = {
+        "status": "ok" if ready else "starting",
+        "mode": GRADER_MODE,
+        "workers": {"ready": ready, "size": GRADER_WORKERS},
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Prometheus text exposition of the grading metrics."""
+    return PlainTextResponse(_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,351 @@
+"""Pre-forked pool of warm grading workers driven from the asyncio event loop."""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from . import scoring
+from .cache import SuiteFingerprint
+
+
+GRADER_SCRIPT = Path(__file__).resolve().with_name("grader.py")
+# Seconds before retrying a replacement worker that died while starting,
+# doubled on each failure up to the maximum.
+RESPAWN_DELAY = 0.5
+RESPAWN_MAX_DELAY = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerDied(Exception):
+    """Raised when a grading worker exits (or is killed) in the middle of a job."""
+
+
+def _worker_main(conn, tests_dir: str, **kwargs) -> None:
+    # Imported in the worker only: the API process never loads pytest.
+    from . import grader
+
+    grader.worker_main(conn, tests_dir, fingerprint=SuiteFingerprint(Path(tests_dir)).current, **kwargs)
+
+
+async def precompile_tests(tests_dir: Path, bytecode_dir: str) -> Dict[str, str]:
+    """Rewrites the official test modules into ``bytecode_dir`` and returns their digests.
+
+    Runs in a fresh process that never imports a submission, so the digests
+    can be trusted even though student code can write to ``bytecode_dir``;
+    workers and sandboxed children only load entries that match them. An
+    empty dict (every module rewritten on import) if the step fails.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-I",
+        "-B",
+        str(GRADER_SCRIPT),
+        "--precompile",
+        str(tests_dir),
+        "--bytecode-dir",
+        bytecode_dir,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    stdout, _ = await proc.communicate()
+    for line in stdout.splitlines():
+        try:
+            kind, payload = json.loads(line)
+        except ValueError:
+            continue
+        if kind == "digests" and proc.returncode == 0:
+            return payload
+    return {}
+
+
+class _Worker:
+    def __init__(self, ctx, tests_dir: Path, options: dict) -> None:
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, str(tests_dir)),
+            kwargs=options,
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+        self.nodeids: List[str] = []
+        # Test suite the worker imported (None if it changed meanwhile).
+        self.fingerprint: str | None = None
+
+    async def recv(self):
+        # Wait on the loop, but read in a thread: the worker may have written
+        # only part of a large message, and conn.recv() blocks until the rest.
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await readable
+        finally:
+            loop.remove_reader(fd)
+        try:
+            return await asyncio.to_thread(self.conn.recv)
+        except (EOFError, OSError) as exc:
+            raise WorkerDied(f"worker {self.process.pid} exited") from exc
+
+    async def wait_ready(self) -> None:
+        kind, info = await self.recv()
+        assert kind == "ready"
+        self.nodeids = info["nodeids"]
+        self.fingerprint = info["fingerprint"]
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+    def stop(self) -> None:
+        # The worker exits on its own; multiprocessing reaps it on the next start().
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class WorkerPool:
+    """A fixed number of warm workers, each grading one submission at a time.
+
+    Workers are recycled after ``max_runs`` submissions. A worker that blows
+    the per-submission wall-clock or CPU budget, or that had a test time out,
+    is killed and replaced without affecting the rest of the pool.
+
+    Workers keep the test modules they imported at start-up, so when the
+    suite fingerprint changes the pool precompiles the tests again and
+    replaces every worker that loaded the previous suite before it grades
+    anything else. Each result carries the ``fingerprint`` of the suite it
+    was graded with.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        tests_dir: Path,
+        *,
+        max_runs: int,
+        memory_mb: int,
+        wall_seconds: float,
+        cpu_seconds: int = 0,
+        test_wall_seconds: float = 0,
+        test_cpu_seconds: float = 0,
+        scratch_dir: str | None = None,
+        bytecode_dir: str | None = None,
+    ) -> None:
+        self.size = size
+        self.tests_dir = tests_dir
+        self.max_runs = max_runs
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self._worker_options = {
+            "memory_mb": memory_mb,
+            "cpu_seconds": cpu_seconds,
+            "test_wall_seconds": test_wall_seconds,
+            "test_cpu_seconds": test_cpu_seconds,
+            "scratch_dir": scratch_dir,
+            "bytecode_dir": bytecode_dir,
+            "bytecode_digests": {},
+        }
+        self._suite = SuiteFingerprint(tests_dir)
+        self.fingerprint: str | None = None
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: asyncio.Queue[_Worker] = asyncio.Queue()
+        self._workers: set[_Worker] = set()
+        self._waiting = 0
+        self._starting = 0
+        self._warm = asyncio.Event()
+        self._closed = False
+        self._respawns: set[asyncio.Task] = set()
+
+    async def _spawn(self) -> None:
+        worker = _Worker(self._ctx, self.tests_dir, self._worker_options)
+        self._workers.add(worker)
+        self._starting += 1
+        try:
+            await worker.wait_ready()
+        except WorkerDied:
+            self._workers.discard(worker)
+            worker.kill()
+            raise
+        finally:
+            self._starting -= 1
+        if self._closed:
+            self._retire(worker)
+            return
+        self._idle.put_nowait(worker)
+        self._warm.set()
+
+    def _retire(self, worker: _Worker) -> None:
+        self._workers.discard(worker)
+        worker.stop()
+
+    def _replace(self, worker: _Worker, *, kill: bool) -> None:
+        self._workers.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        if not self._closed:
+            task = asyncio.get_running_loop().create_task(self._respawn())
+            self._respawns.add(task)
+            task.add_done_callback(self._respawns.discard)
+
+    async def _respawn(self) -> None:
+        """Starts a replacement worker, retrying with backoff so the pool does not shrink."""
+        delay = RESPAWN_DELAY
+        while not self._closed:
+            try:
+                await self._spawn()
+                return
+            except WorkerDied:
+                logger.exception("A replacement grading worker failed to start; retrying in %g s", delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESPAWN_MAX_DELAY)
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def ready(self) -> int:
+        """Workers that finished warming up (idle or grading)."""
+        return len(self._workers) - self._starting
+
+    async def wait_warm(self) -> None:
+        """Returns once at least one worker can grade."""
+        await self._warm.wait()
+
+    async def _precompile(self) -> None:
+        bytecode_dir = self._worker_options["bytecode_dir"]
+        if bytecode_dir:
+            self._worker_options["bytecode_digests"] = await precompile_tests(self.tests_dir, bytecode_dir)
+
+    async def start(self) -> None:
+        self.fingerprint = await asyncio.to_thread(self._suite.current)
+        await self._precompile()
+        await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+
+    async def _check_suite(self) -> None:
+        """Replaces the idle workers if the test suite changed; busy ones are replaced when they finish."""
+        current = await asyncio.to_thread(self._suite.current)
+        if current == self.fingerprint:
+            return
+        self.fingerprint = current
+        await self._precompile()
+        while not self._idle.empty():
+            self._replace(self._idle.get_nowait(), kill=False)
+
+    def _current(self, worker: _Worker) -> bool:
+        if worker.fingerprint is not None and worker.fingerprint == self.fingerprint:
+            return True
+        self._replace(worker, kill=False)
+        return False
+
+    async def _take(self) -> _Worker:
+        while True:
+            worker = await self._idle.get()
+            if worker.fingerprint != self.fingerprint:
+                # A worker started after yet another change to the suite.
+                await self._check_suite()
+            if self._current(worker):
+                return worker
+
+    async def _collect(self, worker: _Worker, on_report: scoring.ReportCallback | None) -> dict:
+        while True:
+            kind, payload = await worker.recv()
+            if kind == "result":
+                return payload
+            if on_report is not None:
+                on_report(payload)
+
+    async def _run(
+        self, worker: _Worker, submission_path: Path, nodeids: List[str] | None, on_report: scoring.ReportCallback | None
+    ) -> dict:
+        worker.conn.send((str(submission_path), nodeids))
+        try:
+            graded = await asyncio.wait_for(self._collect(worker, on_report), timeout=self.wall_seconds)
+        except asyncio.TimeoutError:
+            self._replace(worker, kill=True)
+            return scoring.sandbox_failure(f"La corrección superó el límite de {self.wall_seconds:g} segundos")
+        except WorkerDied:
+            self._replace(worker, kill=True)
+            sigxcpu = getattr(signal, "SIGXCPU", None)
+            if sigxcpu is not None and worker.process.exitcode == -sigxcpu:
+                return scoring.sandbox_failure(f"La corrección superó el límite de {self.cpu_seconds:g} segundos de CPU")
+            return scoring.sandbox_failure(
+                "El proceso de corrección terminó inesperadamente; "
+                "revisá bucles infinitos o uso excesivo de memoria"
+            )
+
+        worker.runs += 1
+        graded["fingerprint"] = worker.fingerprint
+        if graded.get("timed_out"):
+            # The interrupted test may have left the worker in a broken state.
+            self._replace(worker, kill=True)
+        elif worker.runs >= self.max_runs or worker.fingerprint != self.fingerprint:
+            self._replace(worker, kill=False)
+        else:
+            self._idle.put_nowait(worker)
+        return graded
+
+    async def grade(
+        self,
+        submission_path: Path,
+        on_report: scoring.ReportCallback | None = None,
+        on_start: Callable[[int], None] | None = None,
+        *,
+        max_shards: int = 1,
+    ) -> dict:
+        """Grades one submission on the next idle worker.
+
+        With ``max_shards > 1`` and nobody else waiting for a worker, up to
+        that many idle workers are taken and each runs a slice of the tests;
+        the shards are merged back in collection order. ``on_start`` is
+        called with the number of workers assigned, i.e. when the submission
+        stops waiting in the queue.
+        """
+        self._waiting += 1
+        try:
+            await self._check_suite()
+            workers = [await self._take()]
+        finally:
+            self._waiting -= 1
+        order = workers[0].nodeids
+        while len(workers) < min(max_shards, len(order)) and not self._waiting and not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if self._current(worker):
+                workers.append(worker)
+        if on_start is not None:
+            on_start(len(workers))
+        if len(workers) == 1:
+            return await self._run(workers[0], submission_path, None, on_report)
+
+        shards = [order[index :: len(workers)] for index in range(len(workers))]
+        graded = await asyncio.gather(
+            *(self._run(worker, submission_path, shard, on_report) for worker, shard in zip(workers, shards))
+        )
+        merged = scoring.merge_shards(list(graded), order)
+        merged["fingerprint"] = workers[0].fingerprint
+        return merged
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in list(self._respawns):
+            task.cancel()
+        for worker in list(self._workers):
+            self._retire(worker)
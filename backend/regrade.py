@@ -0,0 +1,177 @@
+"""Batch re-grading of stored submissions.
+
+Usage (from the repository root)::
+
+    python -m backend.regrade [--store DIR] [--latest] [--workers N] [--output scoreboard.csv]
+
+Every attempt in the submission store (or only each student's last one with
+``--latest``) is graded by the same warm worker pool the API uses, spread
+over ``--workers`` processes (all CPUs by default). Each distinct file is
+graded once, and files whose result is already cached for the current test
+suite are not graded again. The consolidated scoreboard is written as CSV or
+JSON depending on the extension of ``--output``.
+
+Re-grading never touches the failure log: those counters already include
+every submission the first time it was graded.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from . import scoring
+from .cache import ResultCache, SuiteFingerprint
+from .config import (
+    GRADER_BYTECODE_DIR,
+    GRADER_CACHE_DIR,
+    GRADER_CACHE_DISK_ENTRIES,
+    GRADER_CACHE_SIZE,
+    GRADER_CPU_SECONDS,
+    GRADER_MAX_RUNS,
+    GRADER_MEMORY_MB,
+    GRADER_TEST_CPU_SECONDS,
+    GRADER_TEST_WALL_SECONDS,
+    GRADER_WALL_SECONDS,
+    SUBMISSIONS_DIR,
+    TESTS_DIR,
+)
+from .pool import WorkerPool
+from .storage import SubmissionStore
+
+
+SCOREBOARD_FIELDS = [
+    "submission_id",
+    "student",
+    "student_name",
+    "submitted_at",
+    "sha256",
+    "score",
+    "passed",
+    "total_tests",
+    "exit_code",
+    "cached",
+]
+
+
+def _row(submission: dict, graded: dict, *, cached: bool) -> dict:
+    summary = scoring.summarize(graded["results"])
+    return {
+        "submission_id": submission["id"],
+        "student": submission["student"],
+        "student_name": submission["student_name"],
+        "submitted_at": submission["submitted_at"],
+        "sha256": submission["sha256"],
+        "score": summary["score"],
+        "passed": summary["passed"],
+        "total_tests": summary["total_tests"],
+        "exit_code": graded["exit_code"],
+        "cached": cached,
+    }
+
+
+async def regrade(store: SubmissionStore, submissions: List[dict], *, workers: int, cache: ResultCache) -> List[dict]:
+    fingerprint = SuiteFingerprint(TESTS_DIR).current()
+    rows: List[dict] = [None] * len(submissions)
+    # Identical files (e.g. resubmissions) are graded once per batch.
+    pending: Dict[str, List[Tuple[int, dict]]] = {}
+    for index, submission in enumerate(submissions):
+        graded = cache.get(fingerprint, submission["sha256"])
+        if graded is not None:
+            rows[index] = _row(submission, graded, cached=True)
+        else:
+            pending.setdefault(submission["sha256"], []).append((index, submission))
+
+    if not pending:
+        return rows
+
+    pool = WorkerPool(
+        min(workers, len(pending)),
+        TESTS_DIR,
+        max_runs=GRADER_MAX_RUNS,
+        memory_mb=GRADER_MEMORY_MB,
+        wall_seconds=GRADER_WALL_SECONDS,
+        cpu_seconds=GRADER_CPU_SECONDS,
+        test_wall_seconds=GRADER_TEST_WALL_SECONDS,
+        test_cpu_seconds=GRADER_TEST_CPU_SECONDS,
+        bytecode_dir=GRADER_BYTECODE_DIR,
+    )
+    await pool.start()
+
+    async def grade_one(digest: str, copies: List[Tuple[int, dict]]) -> None:
+        graded = await pool.grade(store.blob_path(digest).resolve())
+        loaded = graded.pop("fingerprint", None)
+        if graded["exit_code"] >= 0 and not graded.get("timed_out") and loaded == fingerprint:
+            await asyncio.to_thread(cache.put, fingerprint, digest, graded)
+        for index, submission in copies:
+            rows[index] = _row(submission, graded, cached=False)
+
+    try:
+        await asyncio.gather(*(grade_one(digest, copies) for digest, copies in pending.items()))
+    finally:
+        await pool.close()
+    return rows
+
+
+def write_scoreboard(rows: List[dict], output: Path) -> None:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if output.suffix == ".json":
+        output.write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding="utf-8")
+        return
+    with output.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=SCOREBOARD_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Vuelve a corregir todas las entregas guardadas.")
+    parser.add_argument("--store", type=Path, default=SUBMISSIONS_DIR, help="almacén de entregas")
+    parser.add_argument("--latest", action="store_true", help="solo la última entrega de cada alumno")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesos de corrección")
+    parser.add_argument("--output", type=Path, default=Path("scoreboard.csv"), help="scoreboard .csv o .json")
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path(GRADER_CACHE_DIR) if GRADER_CACHE_DIR else None,
+        help="caché de resultados en disco (por defecto GRADER_CACHE_DIR)",
+    )
+    args = parser.parse_args(argv)
+
+    if not TESTS_DIR.exists():
+        parser.error(f"no se encontró la carpeta de tests: {TESTS_DIR}")
+    store = SubmissionStore(args.store)
+    store.open()
+    try:
+        submissions = store.records(latest_only=args.latest)
+        if not submissions:
+            print(f"No hay entregas en {args.store}", file=sys.stderr)
+            return 1
+
+        cache = ResultCache(
+            max(GRADER_CACHE_SIZE, len(submissions)),
+            args.cache_dir,
+            max_disk_entries=max(GRADER_CACHE_DISK_ENTRIES, len(submissions)),
+        )
+        started = time.perf_counter()
+        rows = asyncio.run(regrade(store, submissions, workers=max(1, args.workers), cache=cache))
+        elapsed = time.perf_counter() - started
+    finally:
+        store.close()
+    write_scoreboard(rows, args.output)
+
+    cached = sum(1 for row in rows if row["cached"])
+    print(
+        f"{len(rows)} entregas ({len(rows) - cached} corregidas, {cached} desde caché) "
+        f"en {elapsed:.2f} s: {len(rows) / elapsed:.1f} entregas/s -> {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Scoring grading results, sandbox failures and merging shards.
+
+Pure functions with no pytest import, shared by the API, the worker pool and
+the command-line tools; the grading processes themselves produce the result
+dicts (see :mod:`backend.grader`).
+"""
+
+from typing import Callable, Dict, List
+
+
+ReportCallback = Callable[[dict], None]
+
+
+SANDBOX_PHASE = "sandbox"
+
+
+def sandbox_failure(message: str) -> dict:
+    """Result reported when the grading process itself had to be stopped."""
+    return {
+        "results": [{"nodeid": "bookbyte.py", "outcome": "failed", "phase": SANDBOX_PHASE, "message": message}],
+        "exit_code": -1,
+    }
+
+
+def is_sandbox_failure(results: List[dict]) -> bool:
+    return any(r.get("phase") == SANDBOX_PHASE for r in results)
+
+
+def failing_nodeids(results: List[dict]) -> List[str]:
+    """Nodeids of the failing reports, for the failure log; a stopped sandbox is not a test."""
+    return [r["nodeid"] for r in results if r["outcome"] != "passed" and r.get("phase") != SANDBOX_PHASE]
+
+
+def summarize(results: List[dict]) -> dict:
+    """Score of a graded run: only call-phase reports count as tests."""
+    test_reports = [r for r in results if r.get("phase", "call") == "call"]
+    total = len(test_reports)
+    passed = sum(1 for r in test_reports if r["outcome"] == "passed")
+    failed = [r for r in results if r["outcome"] != "passed"]
+    score = 100.0 * passed / total if total else 0.0
+    return {"score": round(score, 2), "total_tests": total, "passed": passed, "failed": failed}
+
+
+def merge_shards(shards: List[dict], order: List[str]) -> dict:
+    """Combines the results of one submission graded in several shards.
+
+    Reports are sorted by the position of their nodeid in ``order`` (the
+    serial collection order), so the merged result is the same no matter
+    which shard finished first. Collection errors every shard hit are kept
+    once; timings are the slowest shard's, since shards run in parallel.
+
+    If a shard's worker had to be stopped (``exit_code < 0``), its tests never
+    reported; like a serial run stopped the same way, the whole submission is
+    that shard's sandbox failure, instead of a score over the other shards.
+    """
+    for shard in shards:
+        if shard["exit_code"] < 0:
+            return dict(shard, shards=len(shards))
+    position = {nodeid: index for index, nodeid in enumerate(order)}
+    phases = {"collect": 0, "setup": 1, "call": 2, "teardown": 3}
+    results: List[dict] = []
+    seen_errors = set()
+    for shard in shards:
+        for entry in shard["results"]:
+            if entry.get("phase") == "collect":
+                key = (entry["nodeid"], entry.get("message"))
+                if key in seen_errors:
+                    continue
+                seen_errors.add(key)
+            results.append(entry)
+    results.sort(key=lambda entry: (position.get(entry["nodeid"], -1), phases.get(entry.get("phase", "call"), 2)))
+    exit_codes = [shard["exit_code"] for shard in shards]
+    timings: Dict[str, float] = {}
+    for shard in shards:
+        for stage, seconds in shard.get("timings", {}).items():
+            timings[stage] = max(timings.get(stage, 0.0), seconds)
+    return {
+        "results": results,
+        "exit_code": -1 if min(exit_codes) < 0 else max(exit_codes),
+        "timings": timings,
+        "timed_out": any(shard.get("timed_out") for shard in shards),
+        "shards": len(shards),
+    }
@@ -0,0 +1,40 @@
+"""SQLite helpers shared by the stores: the failure log (``failures``), the
+submission index (``storage``), the job queue (``jobqueue``) and the
+analytics (``analytics``).
+
+Every store keeps one connection per process, in WAL mode so that several
+API processes can share the database file, used from worker threads under
+the store's own lock; writes that must be atomic across processes are a
+single ``BEGIN IMMEDIATE`` transaction.
+"""
+
+import sqlite3
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import ContextManager, Iterator
+
+
+def connect(path: Path, schema: str) -> sqlite3.Connection:
+    """Opens (creating it if needed) the database at ``path`` and runs ``schema``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(schema)
+    return db
+
+
+@contextmanager
+def transaction(db: sqlite3.Connection, lock: ContextManager | None = None) -> Iterator[sqlite3.Connection]:
+    """Runs the block in a ``BEGIN IMMEDIATE`` transaction, holding ``lock`` if given.
+
+    Commits if the block returns and rolls back if it raises.
+    """
+    with lock if lock is not None else nullcontext():
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
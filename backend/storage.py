@@ -0,0 +1,216 @@
+"""Content-addressed submission store.
+
+Every distinct file is kept once as ``blobs/<sha[:2]>/<sha>.py`` (read-only)
+and a SQLite index maps each attempt, ``(student, submitted_at)``, to its
+blob. Resubmitting the same file costs one index row, attempts never collide
+on a file name, and a student's history is a single indexed range scan.
+
+Command line (from the repository root)::
+
+    python -m backend.storage pack exam.zip [--since 2024-06-01T08:00] [--until ...]
+    python -m backend.storage import-legacy [DIR]
+
+``pack`` writes every attempt in the range into one zip (each blob once plus
+a ``submissions.json`` manifest); ``import-legacy`` moves the old
+``<timestamp>_<student>.py`` files into the store.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from .config import SUBMISSIONS_DIR
+from .sqlite import connect
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student TEXT NOT NULL,
+    student_name TEXT NOT NULL,
+    submitted_at INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    score REAL
+);
+CREATE INDEX IF NOT EXISTS submissions_by_student ON submissions (student, submitted_at);
+CREATE INDEX IF NOT EXISTS submissions_by_time ON submissions (submitted_at);
+"""
+
+_COLUMNS = "id, student, student_name, submitted_at, sha256, size, score"
+
+
+def _record(row) -> dict:
+    id_, student, student_name, submitted_at, sha256, size, score = row
+    return {
+        "id": id_,
+        "student": student,
+        "student_name": student_name,
+        "submitted_at": submitted_at / 1e9,
+        "sha256": sha256,
+        "size": size,
+        "score": score,
+    }
+
+
+class SubmissionStore:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.blobs_dir = root / "blobs"
+        # Uploads are streamed here first; same filesystem as the blobs, so
+        # adopting one is an atomic rename.
+        self.incoming_dir = root / "incoming"
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def open(self) -> None:
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+        self._db = connect(self.root / "index.db", _SCHEMA)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # -- writing -------------------------------------------------------------
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / f"{digest}.py"
+
+    def add(
+        self, partial: Path, digest: str, student: str, student_name: str, *, submitted_at_ns: int | None = None
+    ) -> dict:
+        """Adopts a fully written upload as the blob for ``digest`` and indexes the attempt.
+
+        If the blob already exists the upload is simply discarded.
+        """
+        blob = self.blob_path(digest)
+        size = partial.stat().st_size
+        if blob.exists():
+            partial.unlink()
+        else:
+            blob.parent.mkdir(exist_ok=True)
+            os.replace(partial, blob)
+        submitted_at = submitted_at_ns if submitted_at_ns is not None else time.time_ns()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO submissions (student, student_name, submitted_at, sha256, size) VALUES (?, ?, ?, ?, ?)",
+                (student, student_name, submitted_at, digest, size),
+            )
+        return _record((cursor.lastrowid, student, student_name, submitted_at, digest, size, None))
+
+    def set_score(self, submission_id: int, score: float) -> None:
+        with self._lock:
+            self._db.execute("UPDATE submissions SET score = ? WHERE id = ?", (score, submission_id))
+
+    # -- reading -------------------------------------------------------------
+
+    def history(self, student: str, limit: int | None = None) -> List[dict]:
+        """A student's attempts, newest first."""
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM submissions WHERE student = ? ORDER BY submitted_at DESC LIMIT ?",
+                (student, -1 if limit is None else limit),
+            ).fetchall()
+        return [_record(row) for row in rows]
+
+    def records(
+        self, *, since_ns: int | None = None, until_ns: int | None = None, latest_only: bool = False
+    ) -> List[dict]:
+        """Attempts submitted in ``[since, until)``, oldest first; optionally only each student's last one."""
+        query = f"SELECT {_COLUMNS} FROM submissions WHERE submitted_at >= ? AND submitted_at < ?"
+        params = (since_ns or 0, until_ns if until_ns is not None else 2**63 - 1)
+        if latest_only:
+            query = (
+                f"SELECT {_COLUMNS} FROM submissions s WHERE id = ("
+                "SELECT id FROM submissions WHERE student = s.student AND submitted_at >= ? AND submitted_at < ? "
+                "ORDER BY submitted_at DESC, id DESC LIMIT 1)"
+            )
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY submitted_at, id", params).fetchall()
+        return [_record(row) for row in rows]
+
+    # -- maintenance ---------------------------------------------------------
+
+    def pack(self, archive: Path, *, since_ns: int | None = None, until_ns: int | None = None) -> dict:
+        """Writes the attempts in range into one zip: each blob once plus a JSON manifest."""
+        records = self.records(since_ns=since_ns, until_ns=until_ns)
+        blobs = sorted({record["sha256"] for record in records})
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for digest in blobs:
+                bundle.write(self.blob_path(digest), f"blobs/{digest}.py")
+            bundle.writestr("submissions.json", json.dumps(records, indent=2, ensure_ascii=False))
+        return {"submissions": len(records), "blobs": len(blobs)}
+
+    def import_legacy(self, directory: Path) -> int:
+        """Moves ``<timestamp>_<student>.py`` files (the old flat layout) into the store."""
+        imported = 0
+        for path in sorted(directory.glob("*.py")):
+            timestamp, _, student = path.stem.partition("_")
+            if not timestamp.isdigit() or not student:
+                continue
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            fd, partial = tempfile.mkstemp(dir=self.incoming_dir, suffix=".part")
+            os.close(fd)
+            try:
+                os.replace(path, partial)
+            except FileNotFoundError:
+                # Another API process starting at the same time took it.
+                os.unlink(partial)
+                continue
+            os.chmod(partial, 0o444)
+            self.add(Path(partial), digest, student, student, submitted_at_ns=int(timestamp) * 10**9)
+            imported += 1
+        return imported
+
+
+def _parse_time(value: str | None) -> int | None:
+    if value is None:
+        return None
+    return int(datetime.fromisoformat(value).timestamp() * 10**9)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Mantenimiento del almacén de entregas.")
+    parser.add_argument("--store", type=Path, default=SUBMISSIONS_DIR, help="carpeta del almacén")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="empaqueta las entregas en un único .zip")
+    pack.add_argument("archive", type=Path)
+    pack.add_argument("--since", help="fecha/hora ISO de inicio (incluida)")
+    pack.add_argument("--until", help="fecha/hora ISO de fin (excluida)")
+    legacy = commands.add_parser("import-legacy", help="importa archivos <timestamp>_<alumno>.py")
+    legacy.add_argument("directory", type=Path, nargs="?")
+    args = parser.parse_args(argv)
+
+    store = SubmissionStore(args.store)
+    store.open()
+    try:
+        if args.command == "pack":
+            counts = store.pack(args.archive, since_ns=_parse_time(args.since), until_ns=_parse_time(args.until))
+            print(f"{counts['submissions']} entregas ({counts['blobs']} archivos distintos) -> {args.archive}")
+        else:
+            imported = store.import_legacy(args.directory or args.store)
+            print(f"{imported} entregas importadas")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+from backend import scoring
+from backend.analytics import AnalyticsStore
+
+
+def test_sandbox_failures_are_counted_apart(tmp_path):
+    store = AnalyticsStore(tmp_path / "analytics.db", pass_score=60)
+    store.open()
+    try:
+        results = scoring.sandbox_failure("La corrección superó el límite de 30 segundos")["results"]
+        store.record(
+            "ada",
+            "Ada",
+            1000.0,
+            0.0,
+            (item for item in results if item.get("phase", "call") == "call"),
+            scoring.failing_nodeids(results),
+            sandbox_failure=True,
+        )
+        store.record("ada", "Ada", 1060.0, 50.0, [{"nodeid": "t::a", "outcome": "failed"}], ["t::a"])
+        summary = store.summary(window_seconds=10**10, top=10)
+    finally:
+        store.close()
+
+    assert summary["submissions"] == 2
+    assert summary["sandbox_failures"] == 1
+    assert summary["tests"] == [{"nodeid": "t::a", "runs": 1, "passed": 0, "pass_rate": 0.0}]
+    assert summary["top_failing"]["tests"] == [{"nodeid": "t::a", "count": 1}]
+    assert summary["students"]["attempts_histogram"] == [{"attempts": 2, "students": 1}]
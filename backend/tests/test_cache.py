@@ -0,0 +1,40 @@
+import os
+
+from backend.cache import ResultCache, SuiteFingerprint
+
+
+def test_disk_entries_survive_and_suite_change_drops_them(tmp_path):
+    ResultCache(4, tmp_path).put("a" * 64, "d1", {"score": 1})
+
+    cache = ResultCache(4, tmp_path)
+    assert cache.get("a" * 64, "d1") == {"score": 1}
+    assert cache.get("b" * 64, "d1") is None
+    assert [child.name for child in tmp_path.iterdir()] == []
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1}
+
+
+def test_disk_cap_deletes_least_recently_used(tmp_path):
+    fingerprint = "f" * 64
+    cache = ResultCache(1, tmp_path, max_disk_entries=10)
+    for index in range(10):
+        cache.put(fingerprint, f"d{index}", {"score": index})
+        path = cache._entry_path(fingerprint, f"d{index}")
+        os.utime(path, ns=(index * 10**9, index * 10**9))
+    # A disk hit makes d0 the most recently used.
+    assert ResultCache(1, tmp_path).get(fingerprint, "d0") == {"score": 0}
+
+    cache.put(fingerprint, "d10", {"score": 10})
+
+    # Eleven files over a cap of ten: the two oldest go, nine remain.
+    kept = {path.stem for path in (tmp_path / fingerprint[:16]).iterdir()}
+    assert kept == {"d0"} | {f"d{index}" for index in range(3, 11)}
+
+
+def test_suite_fingerprint_follows_file_changes(tmp_path):
+    (tmp_path / "test_a.py").write_text("a = 1\n")
+    suite = SuiteFingerprint(tmp_path)
+    first = suite.current()
+    assert suite.current() == first
+
+    (tmp_path / "test_a.py").write_text("a = 22\n")
+    assert suite.current() != first
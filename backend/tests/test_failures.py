@@ -0,0 +1,90 @@
+import pytest
+
+from backend.failures import FailureStore
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def make(**options):
+        store = FailureStore(tmp_path / "failures.db", tmp_path / "failures.journal", lambda nodeid: f"ver {nodeid}", **options)
+        store.open()
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def _counts(view):
+    return {nodeid: info["count"] for nodeid, info in view["failures"].items()}
+
+
+def test_record_then_flush_bumps_version_and_etag(make_store):
+    store = make_store()
+    assert (store.version, store.etag()) == (0, 'W/"0"')
+
+    view = store.record(["t::a", "t::a", "t::b"])
+    assert _counts(view) == {"t::a": 2, "t::b": 1}
+    assert view["failures"]["t::a"]["last_feedback"] == "ver t::a"
+    unflushed = store.etag()
+    assert unflushed != 'W/"0"'
+    store.record(["t::b"])
+    assert store.etag() != unflushed
+
+    store.flush()
+    assert (store.version, store.etag()) == (1, 'W/"1"')
+    assert _counts(store.snapshot()) == {"t::a": 2, "t::b": 2}
+    # Nothing new: flushing again changes nothing.
+    store.flush()
+    assert store.etag() == 'W/"1"'
+
+
+def test_processes_sharing_the_journal_count_each_line_once(make_store):
+    first, second = make_store(), make_store()
+    first.record(["t::a"])
+    second.record(["t::a", "t::b"])
+
+    first.flush()
+    second.flush()
+
+    assert _counts(first.snapshot()) == _counts(second.snapshot()) == {"t::a": 2, "t::b": 1}
+    assert first.version == second.version == 1
+
+
+def test_rotation_keeps_every_count(make_store, tmp_path):
+    store = make_store(max_journal_bytes=64)
+    for _ in range(5):
+        store.record(["tests/test_x.py::test_something_long"])
+        store.flush()
+    assert store._meta("journal_generation") >= 2
+    store.record(["t::b"])
+    store.close()
+
+    # The rotated segments were applied and deleted; the journal restarted.
+    assert sorted(path.name for path in tmp_path.iterdir() if ".journal." in path.name) == ["failures.journal.lock"]
+    reopened = make_store(max_journal_bytes=64)
+    assert _counts(reopened.snapshot()) == {"tests/test_x.py::test_something_long": 5, "t::b": 1}
+
+
+def test_changes_since_returns_only_the_delta(make_store):
+    store = make_store()
+    store.record(["t::a", "t::b"])
+    store.flush()
+    store.record(["t::b", "t::c"])
+    store.flush()
+
+    delta = store.changes_since(1)
+    assert (delta["version"], delta["full"]) == (2, False)
+    assert _counts(delta) == {"t::b": 2, "t::c": 1}
+
+    store.record(["t::a"])
+    # Counters recorded but not flushed yet are part of the delta.
+    assert _counts(store.changes_since(2)) == {"t::a": 2}
+    assert _counts(store.changes_since(0)) == {"t::a": 2, "t::b": 2, "t::c": 1}
+
+    # A version this store has never seen (e.g. a reset database) gets everything.
+    reset = store.changes_since(99)
+    assert reset["full"] is True and len(reset["failures"]) == 3
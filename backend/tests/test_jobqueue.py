@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend import jobqueue
+from backend.admission import AdmissionRejected, take_token
+from backend.jobqueue import JobQueue
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(jobqueue, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def make_queue(tmp_path, clock):
+    queues = []
+
+    def make(**options):
+        defaults = {"max_inflight": 10, "retry_after": 3.0, "rate_per_second": 0.0, "burst": 3, "stale_after": 60.0}
+        queue = JobQueue(tmp_path / "jobs.db", **{**defaults, **options})
+        queue.open()
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def _submit(queue, student="ada"):
+    job_id = queue.admit(student, student.title())
+    superseded = queue.enqueue(job_id, {"id": 1, "sha256": "0" * 64}, 0.1)
+    return job_id, superseded
+
+
+def test_take_token_refills_up_to_the_burst():
+    assert take_token(3.0, 0.0, 0.0, rate=0.5, burst=3) == (2.0, 0.0)
+    # Empty bucket: nothing taken, and 1.5 s until the next token.
+    assert take_token(0.25, 10.0, 10.0, rate=0.5, burst=3) == (0.25, 1.5)
+    # A long pause refills the bucket, but never above the burst.
+    assert take_token(0.0, 0.0, 1000.0, rate=0.5, burst=3) == (2.0, 0.0)
+
+
+def test_rate_limit_per_student(make_queue, clock):
+    queue = make_queue(rate_per_second=0.5, burst=2)
+    queue.admit("ada", "Ada")
+    queue.admit("ada", "Ada")
+    with pytest.raises(AdmissionRejected) as rejected:
+        queue.admit("ada", "Ada")
+    assert (rejected.value.reason, rejected.value.retry_after) == ("rate_limited", 2.0)
+    # Other students have their own bucket.
+    queue.admit("bob", "Bob")
+
+    clock.now += 2.0
+    queue.admit("ada", "Ada")
+
+
+def test_rate_zero_disables_the_limit(make_queue):
+    queue = make_queue(rate_per_second=0.0, burst=1)
+    for _ in range(5):
+        queue.admit("ada", "Ada")
+
+
+def test_inflight_cap_and_abandon(make_queue):
+    queue = make_queue(max_inflight=2)
+    first = queue.admit("ada", "Ada")
+    queue.admit("bob", "Bob")
+    with pytest.raises(AdmissionRejected) as rejected:
+        queue.admit("cy", "Cy")
+    assert (rejected.value.reason, rejected.value.retry_after) == ("busy", 3.0)
+
+    queue.abandon(first)
+    assert queue.get(first) is None
+    queue.admit("cy", "Cy")
+    assert queue.inflight() == 2
+
+
+def test_resubmission_supersedes_the_queued_one(make_queue, clock):
+    queue = make_queue()
+    old, _ = _submit(queue)
+    other, _ = _submit(queue, "bob")
+    clock.now += 1
+    new, superseded = _submit(queue)
+
+    assert superseded == [old]
+    assert queue.get(old)["status"] == "superseded"
+    assert queue.events(old) == [{"id": 0, "event": "superseded", "data": {"replaced_by": new}}]
+    # The oldest queued job is claimed first.
+    assert queue.claim("p1")["id"] == other
+    claimed = queue.claim("p1")
+    assert (claimed["id"], claimed["status"], claimed["owner"]) == (new, "running", "p1")
+    assert queue.claim("p1") is None
+    # A running job is not superseded.
+    assert _submit(queue)[1] == []
+
+
+def test_requeue_puts_the_job_back_without_its_events(make_queue):
+    queue = make_queue()
+    job_id, _ = _submit(queue)
+    queue.claim("p1")
+    queue.publish(job_id, [("status", {"status": "running"}), ("report", {"nodeid": "t::a"})])
+    assert [event["event"] for event in queue.events(job_id)] == ["status", "report"]
+
+    queue.requeue(job_id)
+
+    job = queue.get(job_id)
+    assert (job["status"], job["owner"]) == ("queued", None)
+    assert queue.events(job_id) == []
+    assert queue.claim("p2")["id"] == job_id
+
+
+def test_prune_fails_stale_jobs_and_drops_old_ones(make_queue, clock):
+    queue = make_queue(stale_after=60.0)
+    finished, _ = _submit(queue, "ada")
+    queue.claim("p1")
+    queue.finish(finished, "done", "done", {"score": 100}, result={"score": 100})
+    stale_receiving = queue.admit("bob", "Bob")
+    stale_running, _ = _submit(queue, "cy")
+    queue.claim("p1")
+
+    clock.now += 61
+    fresh, _ = _submit(queue, "dee")
+    failed = queue.prune(finished_before=clock.now - 30, error="perdido")
+
+    assert failed == [stale_running]
+    assert queue.get(stale_running)["status"] == "error"
+    assert queue.events(stale_running)[-1] == {"id": 0, "event": "error", "data": {"detail": "perdido"}}
+    assert queue.get(stale_receiving) is None
+    assert queue.get(finished) is None and queue.events(finished) == []
+    assert queue.get(fresh)["status"] == "queued"
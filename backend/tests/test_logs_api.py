@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.failures import FailureStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = FailureStore(tmp_path / "failures.db", tmp_path / "failures.journal", main._build_feedback)
+    store.open()
+    monkeypatch.setattr(main, "_failure_store", store)
+    monkeypatch.setattr(main, "_logs_body", ("", b""))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def client(store):
+    # Without the context manager the lifespan (stores, worker pool) does not run.
+    return TestClient(main.app)
+
+
+def test_etag_and_304(client, store):
+    store.record(["t::a"])
+    store.flush()
+
+    first = client.get("/api/logs")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.json()["version"] == 1
+    assert first.json()["failures"]["t::a"]["count"] == 1
+
+    assert client.get("/api/logs", headers={"If-None-Match": etag}).status_code == 304
+
+    store.record(["t::a"])
+    changed = client.get("/api/logs", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["failures"]["t::a"]["count"] == 2
+
+
+def test_since_returns_the_delta(client, store):
+    store.record(["t::a", "t::b"])
+    store.flush()
+    store.record(["t::b"])
+    store.flush()
+
+    delta = client.get("/api/logs", params={"since": 1}).json()
+    assert delta == {
+        "failures": {"t::b": {"count": 2, "last_feedback": main._build_feedback("t::b")}},
+        "version": 2,
+        "full": False,
+    }
+    assert client.get("/api/logs", params={"since": 2}).json()["failures"] == {}
@@ -0,0 +1,69 @@
+import asyncio
+import multiprocessing
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from backend import pool
+from backend.pool import WorkerDied, WorkerPool, _Worker
+
+
+class _Retired:
+    def stop(self) -> None:
+        pass
+
+
+def _worker_on(conn) -> _Worker:
+    worker = object.__new__(_Worker)
+    worker.conn = conn
+    worker.process = SimpleNamespace(pid=0)
+    return worker
+
+
+def test_recv_reads_a_message_larger_than_the_pipe_buffer():
+    parent, child = multiprocessing.Pipe()
+    payload = ("report", "x" * (4 << 20))
+
+    async def main():
+        # The sender is still writing when the pipe first becomes readable.
+        sender = threading.Thread(target=child.send, args=(payload,))
+        sender.start()
+        received = await _worker_on(parent).recv()
+        sender.join()
+        return received
+
+    assert asyncio.run(main()) == payload
+
+
+def test_recv_raises_worker_died_on_eof():
+    parent, child = multiprocessing.Pipe()
+    child.close()
+    with pytest.raises(WorkerDied):
+        asyncio.run(_worker_on(parent).recv())
+
+
+def test_replace_retries_a_spawn_that_fails(monkeypatch, caplog):
+    monkeypatch.setattr(pool, "RESPAWN_DELAY", 0)
+    attempts = []
+
+    async def main():
+        worker_pool = WorkerPool(1, Path("."), max_runs=1, memory_mb=0, wall_seconds=1)
+
+        async def spawn():
+            attempts.append(None)
+            if len(attempts) < 3:
+                raise WorkerDied("worker 0 exited")
+            worker_pool._warm.set()
+
+        worker_pool._spawn = spawn
+        worker_pool._replace(_Retired(), kill=False)
+        await asyncio.wait_for(worker_pool.wait_warm(), timeout=5)
+        await asyncio.sleep(0)
+        return worker_pool
+
+    worker_pool = asyncio.run(main())
+    assert len(attempts) == 3
+    assert not worker_pool._respawns
+    assert caplog.text.count("failed to start") == 2
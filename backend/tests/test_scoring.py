@@ -0,0 +1,45 @@
+from backend import scoring
+
+
+def _report(nodeid, outcome="passed", phase="call"):
+    return {"nodeid": nodeid, "outcome": outcome, "phase": phase}
+
+
+def test_merge_shards_keeps_serial_order():
+    order = ["t::a", "t::b", "t::c", "t::d"]
+    shards = [
+        {"results": [_report("t::b"), _report("t::d", "failed")], "exit_code": 1, "timings": {"execution": 0.2}},
+        {"results": [_report("t::a"), _report("t::c")], "exit_code": 0, "timings": {"execution": 0.5}},
+    ]
+
+    merged = scoring.merge_shards(shards, order)
+
+    assert [entry["nodeid"] for entry in merged["results"]] == order
+    assert merged["exit_code"] == 1
+    assert merged["timings"] == {"execution": 0.5}
+    assert scoring.summarize(merged["results"])["score"] == 75.0
+
+
+def test_merge_shards_killed_shard_fails_the_submission():
+    order = ["t::a", "t::b", "t::c", "t::d"]
+    killed = scoring.sandbox_failure("La corrección superó el límite de 30 segundos de CPU")
+    shards = [
+        {"results": [_report("t::a"), _report("t::c")], "exit_code": 0, "timings": {}},
+        killed,
+    ]
+
+    merged = scoring.merge_shards(shards, order)
+
+    # Same outcome as a serial run whose worker was killed.
+    assert merged["results"] == killed["results"]
+    assert merged["exit_code"] < 0
+    assert scoring.summarize(merged["results"])["score"] == 0.0
+
+
+def test_sandbox_failure_is_not_a_failing_test():
+    results = scoring.sandbox_failure("La corrección superó el límite de 30 segundos")["results"]
+    results += [_report("t::a", "failed"), _report("t::b", "error", phase="setup")]
+
+    assert scoring.is_sandbox_failure(results)
+    assert not scoring.is_sandbox_failure(results[1:])
+    assert scoring.failing_nodeids(results) == ["t::a", "t::b"]
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.storage import SubmissionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SubmissionStore(tmp_path / "store")
+    store.open()
+    yield store
+    store.close()
+
+
+def _upload(store, data: bytes, name: str) -> tuple:
+    partial = store.incoming_dir / name
+    partial.write_bytes(data)
+    return partial, hashlib.sha256(data).hexdigest()
+
+
+def test_identical_files_share_one_blob(store):
+    first = store.add(*_upload(store, b"x = 1\n", "a.part"), "ada", "Ada", submitted_at_ns=1 * 10**9)
+    second = store.add(*_upload(store, b"x = 1\n", "b.part"), "ada", "Ada", submitted_at_ns=2 * 10**9)
+    store.add(*_upload(store, b"x = 2\n", "c.part"), "bob", "Bob", submitted_at_ns=3 * 10**9)
+    store.set_score(first["id"], 50.0)
+
+    assert first["sha256"] == second["sha256"]
+    assert sum(len(files) for _, _, files in os.walk(store.blobs_dir)) == 2
+    assert list(store.incoming_dir.iterdir()) == []
+    history = store.history("ada")
+    assert [(entry["id"], entry["score"]) for entry in history] == [(second["id"], None), (first["id"], 50.0)]
+    assert [entry["id"] for entry in store.history("ada", 1)] == [second["id"]]
+    with pytest.raises(ValueError):
+        store.history("ada", -1)
+
+
+def test_import_legacy_round_trip(store, tmp_path):
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    (legacy / "1700000000_ada.py").write_bytes(b"print('v1')\n")
+    (legacy / "1700000060_ada.py").write_bytes(b"print('v2')\n")
+    (legacy / "notas.py").write_bytes(b"# no es una entrega\n")
+
+    assert store.import_legacy(legacy) == 2
+    assert store.import_legacy(legacy) == 0
+    assert sorted(path.name for path in legacy.iterdir()) == ["notas.py"]
+
+    history = store.history("ada")
+    assert [entry["submitted_at"] for entry in history] == [1700000060.0, 1700000000.0]
+    blob = store.blob_path(history[0]["sha256"])
+    assert blob.read_bytes() == b"print('v2')\n"
+    assert blob.stat().st_mode & 0o777 == 0o444
+
+
+def test_pack_writes_each_blob_once(store, tmp_path):
+    for index, name in enumerate(("a", "b", "c")):
+        store.add(*_upload(store, b"same\n", f"{name}.part"), name, name.upper(), submitted_at_ns=index * 10**9)
+
+    archive = tmp_path / "exam.zip"
+    assert store.pack(archive, since_ns=1 * 10**9) == {"submissions": 2, "blobs": 1}
+    with zipfile.ZipFile(archive) as bundle:
+        manifest = json.loads(bundle.read("submissions.json"))
+        assert len(bundle.namelist()) == 2
+    assert [entry["student"] for entry in manifest] == ["b", "c"]
+
+
+def test_history_endpoint_rejects_negative_limit():
+    # Rejected before the store is touched, so the lifespan is not needed.
+    response = TestClient(main.app).get("/api/students/ada/submissions", params={"limit": -1})
+    assert response.status_code == 400
@@ -0,0 +1,56 @@
+import hashlib
+
+import pytest
+
+from backend.upload import SubmissionForm, UploadRejected
+
+BOUNDARY = "b0undary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _part(name, data, filename=None):
+    disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+    return f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + data + b"\r\n"
+
+
+def _form(tmp_path, max_file_bytes=1024):
+    return SubmissionForm(CONTENT_TYPE, tmp_path, max_file_bytes=max_file_bytes, max_field_bytes=64)
+
+
+def test_file_is_written_once_and_ready_before_its_data(tmp_path):
+    source = b"print('hola')\n" * 20
+    head = _part("student_name", "Zoé".encode()) + _part("file", b"", "bookbyte.py")[:-2]
+    form = _form(tmp_path)
+
+    # Byte by byte, to cross every chunk boundary.
+    for byte in head:
+        form.feed(bytes([byte]))
+    assert form.ready and form.student_name == "Zoé"
+    for start in range(0, len(source), 7):
+        form.feed(source[start : start + 7])
+    form.feed(f"\r\n--{BOUNDARY}--\r\n".encode())
+    form.finish()
+
+    assert form.path.read_bytes() == source
+    assert form.digest == hashlib.sha256(source).hexdigest()
+    assert form.path.stat().st_mode & 0o777 == 0o444
+    assert list(tmp_path.iterdir()) == [form.path]
+
+
+@pytest.mark.parametrize(
+    "body, status",
+    [
+        (_part("student_name", b"Ana") + _part("file", b"x", "notas.txt"), 400),
+        (_part("student_name", b"Ana") + _part("file", b"x" * 1025, "a.py"), 413),
+        (_part("student_name", b"Ana"), 422),
+    ],
+)
+def test_rejected_forms_leave_no_file(tmp_path, body, status):
+    form = _form(tmp_path)
+    with pytest.raises(UploadRejected) as rejected:
+        form.feed(body + f"--{BOUNDARY}--\r\n".encode())
+        form.finish()
+    form.discard()
+
+    assert rejected.value.status_code == status
+    assert list(tmp_path.iterdir()) == []
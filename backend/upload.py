@@ -0,0 +1,177 @@
+"""Streaming reception of the submission form.
+
+The ``multipart/form-data`` body of ``/api/submit`` is parsed as it arrives
+instead of letting Starlette spool all of it first: the ``file`` part is
+hashed and written in chunks straight into the store's ``incoming`` dir,
+which is its only copy until the store adopts it as a blob, and the form is
+``ready`` as soon as ``student_name`` and the headers of the file part have
+arrived, so the caller can admit the submission before reading the file
+(the frontend sends ``student_name`` first).
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+FILE_FIELD = "file"
+NAME_FIELD = "student_name"
+
+
+class UploadRejected(Exception):
+    """The form could not be accepted; carries the HTTP status and the message for the student."""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def too_large_detail(max_bytes: int) -> str:
+    return f"El archivo supera el tamaño máximo permitido ({max_bytes // 1024} KB)"
+
+
+class SubmissionForm:
+    def __init__(self, content_type: str, incoming_dir: Path, *, max_file_bytes: int, max_field_bytes: int) -> None:
+        kind, options = parse_options_header(content_type)
+        boundary = options.get(b"boundary")
+        if kind != b"multipart/form-data" or not boundary:
+            raise UploadRejected(400, "La entrega debe enviarse como multipart/form-data")
+        self.incoming_dir = incoming_dir
+        self.max_file_bytes = max_file_bytes
+        self.max_field_bytes = max_field_bytes
+        self.fields: Dict[str, str] = {}
+        self.filename: str | None = None
+        # The partial file and its digest; ``path`` is read-only once finished.
+        self.path: Path | None = None
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._handle = None
+        self._ended = False
+        # The part being parsed: its raw headers, then its name and text value.
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._part: str | None = None
+        self._value = bytearray()
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_end": self._on_end,
+            },
+        )
+
+    @property
+    def ready(self) -> bool:
+        """The student is known and the file part, already validated, has begun."""
+        return NAME_FIELD in self.fields and self.filename is not None
+
+    @property
+    def student_name(self) -> str:
+        return self.fields[NAME_FIELD]
+
+    @property
+    def digest(self) -> str:
+        return self._digest.hexdigest()
+
+    def feed(self, chunk: bytes) -> None:
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError:
+            raise UploadRejected(400, "El formulario de la entrega está mal formado") from None
+
+    def finish(self) -> None:
+        """Checks the whole form arrived and leaves the file read-only at ``path``."""
+        if not self._ended:
+            raise UploadRejected(400, "El formulario de la entrega llegó incompleto")
+        missing = [field for field in (NAME_FIELD, FILE_FIELD) if field not in self.fields]
+        if missing:
+            raise UploadRejected(422, f"Faltan campos del formulario: {', '.join(missing)}")
+        os.chmod(self.path, 0o444)
+
+    def discard(self) -> None:
+        """Removes the partial file, if any; the form is abandoned."""
+        self._close()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+            self.path = None
+
+    def _close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    # -- parser callbacks ----------------------------------------------------
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._part = None
+        self._value.clear()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name in self.fields or (name == FILE_FIELD and self.path is not None):
+            raise UploadRejected(400, f"El campo {name} está repetido")
+        self._part = name
+        if name != FILE_FIELD:
+            return
+        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        if Path(filename).suffix != ".py":
+            raise UploadRejected(400, "Solo se aceptan archivos .py")
+        self.filename = filename
+        fd, partial = tempfile.mkstemp(dir=self.incoming_dir, prefix="upload-", suffix=".part")
+        self.path = Path(partial)
+        self._handle = os.fdopen(fd, "wb")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if self._part == FILE_FIELD:
+            self.size += len(chunk)
+            if self.size > self.max_file_bytes:
+                raise UploadRejected(413, too_large_detail(self.max_file_bytes))
+            self._digest.update(chunk)
+            self._handle.write(chunk)
+        elif self._part == NAME_FIELD:
+            self._value += chunk
+            if len(self._value) > self.max_field_bytes:
+                raise UploadRejected(413, f"El campo {NAME_FIELD} es demasiado largo")
+
+    def _on_part_end(self) -> None:
+        if self._part == FILE_FIELD:
+            self._close()
+            self.fields[FILE_FIELD] = self.filename
+        elif self._part == NAME_FIELD:
+            try:
+                value = self._value.decode("utf-8")
+            except UnicodeDecodeError:
+                raise UploadRejected(400, f"El campo {NAME_FIELD} no es texto UTF-8") from None
+            # Like a required Form(...) field: an empty value counts as missing.
+            if value:
+                self.fields[NAME_FIELD] = value
+        self._part = None
+
+    def _on_end(self) -> None:
+        self._ended = True
@@ -0,0 +1 @@
+"""Reproducible benchmarks for the grading backend (see AUTOGRADER.md)."""
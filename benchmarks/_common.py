@@ -0,0 +1,70 @@
+"""Helpers shared by the benchmark scripts: statistics and JSON result files."""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile; ``samples`` does not need to be sorted."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Timing summary in milliseconds for a list of durations in seconds."""
+    ms = [sample * 1000 for sample in samples]
+    return {
+        "runs": len(ms),
+        "min_ms": round(min(ms), 3) if ms else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def git_revision() -> Dict[str, object]:
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def environment() -> Dict[str, object]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        **git_revision(),
+    }
+
+
+def write_results(kind: str, results: dict, output: Path | None) -> Path:
+    """Stores ``results`` plus environment metadata; defaults to results/<kind>-<commit>.json."""
+    env = environment()
+    if output is None:
+        revision = (env["commit"] or "unknown")[:12] + ("-dirty" if env["dirty"] else "")
+        output = RESULTS_DIR / f"{kind}-{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"benchmark": kind, "environment": env, **results}, indent=2), encoding="utf-8")
+    return output
@@ -0,0 +1,58 @@
+"""Compares two benchmark result files.
+
+Usage::
+
+    python -m benchmarks.compare benchmarks/results/pipeline-<old>.json benchmarks/results/pipeline-<new>.json
+
+Prints every timing (``*_ms``) and throughput metric present in both files
+with its relative change; ``--threshold`` flags regressions above that
+percentage and makes the command exit with status 1.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+
+def _metrics(data: dict, prefix: str = "") -> Dict[str, float]:
+    found = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            found.update(_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if key.endswith("_ms") or key.startswith("throughput"):
+                found[name] = float(value)
+    return found
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compares two benchmark JSON files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args(argv)
+
+    old = json.loads(args.baseline.read_text(encoding="utf-8"))
+    new = json.loads(args.candidate.read_text(encoding="utf-8"))
+    old_metrics, new_metrics = _metrics(old), _metrics(new)
+
+    regressions = 0
+    print(f"{'metric':<45} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for name in sorted(old_metrics.keys() & new_metrics.keys()):
+        before, after = old_metrics[name], new_metrics[name]
+        change = (after - before) / before * 100 if before else 0.0
+        # Throughput regresses when it drops, timings when they grow.
+        worse = -change if name.split(".")[-1].startswith("throughput") else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  <-- regression"
+            regressions += 1
+        print(f"{name:<45} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Load generator for a running backend.
+
+Usage (from the repository root, with the API already running)::
+
+    python -m benchmarks.loadgen --url http://localhost:8000 --requests 200 --concurrency 16
+
+Fires ``--requests`` submissions from ``--concurrency`` concurrent clients,
+mixing the skeleton (``bookbyte.py``) and the reference solution
+(``sol_bookbyte.py``) according to ``--reference-ratio``. Each client posts
+to ``/api/submit`` and polls ``/api/jobs/{id}`` until the job finishes; the
+end-to-end latency (upload to final result) is reported as p50/p95/p99
+together with the throughput in submissions per second.
+
+Every upload gets a unique trailing comment so the result cache does not
+short-circuit grading; pass ``--allow-cache`` to measure cache hits instead.
+Only the standard library is used, so it runs from any machine.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ._common import REPO_ROOT, summarize, write_results
+
+SUBMISSIONS = {"skeleton": REPO_ROOT / "bookbyte.py", "reference": REPO_ROOT / "sol_bookbyte.py"}
+
+
+def _multipart(fields: Dict[str, str], filename: str, content: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: text/x-python\r\n\r\n".encode("utf-8")
+    )
+    parts.append(content)
+    parts.append(f"\r\n--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class LoadTest:
+    def __init__(self, url: str, *, poll_interval: float, timeout: float, allow_cache: bool) -> None:
+        self.url = url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.allow_cache = allow_cache
+        self.sources = {kind: path.read_bytes() for kind, path in SUBMISSIONS.items()}
+        self._lock = threading.Lock()
+        self.samples: List[dict] = []
+
+    def _request(self, request: urllib.request.Request) -> Tuple[int, dict]:
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as exc:
+            return exc.code, {}
+
+    def submit(self, index: int, kind: str) -> None:
+        content = self.sources[kind]
+        if not self.allow_cache:
+            content += f"\n# load {uuid.uuid4().hex}\n".encode("utf-8")
+        body, content_type = _multipart({"student_name": f"load-{index}"}, "bookbyte.py", content)
+        request = urllib.request.Request(
+            f"{self.url}/api/submit", data=body, method="POST", headers={"Content-Type": content_type}
+        )
+        sample = {"kind": kind, "status": None, "submit_s": None, "latency_s": None, "score": None, "cached": None}
+        started = time.perf_counter()
+        try:
+            status, payload = self._request(request)
+            sample["submit_s"] = time.perf_counter() - started
+            sample["status"] = status
+            if status == 202:
+                job = self._wait(payload["job_id"], started)
+                sample["latency_s"] = time.perf_counter() - started
+                sample["status"] = job.get("status")
+                result = job.get("result") or {}
+                sample["score"] = result.get("score")
+                sample["cached"] = result.get("cached")
+        except (OSError, ValueError) as exc:
+            sample["status"] = f"error: {exc}"
+        with self._lock:
+            self.samples.append(sample)
+
+    def _wait(self, job_id: str, started: float) -> dict:
+        while True:
+            _, job = self._request(urllib.request.Request(f"{self.url}/api/jobs/{job_id}"))
+            if job.get("status") in ("done", "error") or time.perf_counter() - started > self.timeout:
+                return job
+            time.sleep(self.poll_interval)
+
+
+def report(samples: List[dict], elapsed: float) -> dict:
+    completed = [s for s in samples if s["status"] == "done"]
+    by_kind = {}
+    for kind in SUBMISSIONS:
+        latencies = [s["latency_s"] for s in completed if s["kind"] == kind]
+        by_kind[kind] = summarize(latencies)
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "sent": len(samples),
+        "completed": len(completed),
+        "statuses": statuses,
+        "throughput_per_s": round(len(completed) / elapsed, 3) if elapsed else 0.0,
+        "latency": summarize([s["latency_s"] for s in completed]),
+        "submit_latency": summarize([s["submit_s"] for s in samples if s["submit_s"] is not None]),
+        "latency_by_kind": by_kind,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent /api/submit load test.")
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the backend")
+    parser.add_argument("--requests", type=int, default=100, help="total submissions to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--reference-ratio", type=float, default=0.5, help="share of sol_bookbyte.py uploads")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="seconds between status polls")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-submission timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the skeleton/reference mix")
+    parser.add_argument("--allow-cache", action="store_true", help="upload identical files (measures cache hits)")
+    parser.add_argument("--output", type=Path, help="JSON file (default: benchmarks/results/loadgen-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    kinds = ["reference" if rng.random() < args.reference_ratio else "skeleton" for _ in range(args.requests)]
+    test = LoadTest(args.url, poll_interval=args.poll_interval, timeout=args.timeout, allow_cache=args.allow_cache)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        for index, kind in enumerate(kinds):
+            executor.submit(test.submit, index, kind)
+    elapsed = time.perf_counter() - started
+
+    results = report(test.samples, elapsed)
+    settings = {key: getattr(args, key) for key in ("url", "requests", "concurrency", "reference_ratio", "allow_cache")}
+    output = write_results("loadgen", {"settings": settings, **results}, args.output)
+
+    latency = results["latency"]
+    print(
+        f"{results['completed']}/{results['sent']} completed in {results['elapsed_s']:.2f} s "
+        f"({results['throughput_per_s']:.2f}/s); latency p50 {latency['p50_ms']:.0f} ms, "
+        f"p95 {latency['p95_ms']:.0f} ms, p99 {latency['p99_ms']:.0f} ms; statuses {results['statuses']}"
+    )
+    print(f"-> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Micro-benchmarks of the grading pipeline stages.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.pipeline [--runs 20] [--output results.json]
+
+Each stage is timed in isolation, ``--runs`` times, against the official
+``tests/`` and both the skeleton (``bookbyte.py``) and the reference
+solution (``sol_bookbyte.py``). Results are written as JSON (by default to
+``benchmarks/results/pipeline-<commit>.json``) so runs can be compared
+across commits with ``python -m benchmarks.compare``.
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from backend import grader, main as api, scoring
+from backend.config import GRADER_MAX_UPLOAD_BYTES, TESTS_DIR
+from backend.failures import FailureStore
+from backend.storage import SubmissionStore
+from backend.upload import SubmissionForm
+
+from ._common import REPO_ROOT, summarize, write_results
+
+SKELETON = REPO_ROOT / "bookbyte.py"
+REFERENCE = REPO_ROOT / "sol_bookbyte.py"
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silences pytest's terminal output (it writes straight to fd 1)."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+def _time(runs: int, stage: Callable[[], None], setup: Callable[[], None] | None = None) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        stage()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_upload_write(runs: int, workdir: Path) -> List[float]:
+    data = REFERENCE.read_bytes()
+    store = SubmissionStore(workdir / "store")
+    store.open()
+    boundary = "bench-boundary"
+
+    def run(index: int) -> None:
+        # A distinct file each time, so every run writes a new blob.
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="student_name"\r\n\r\nbench\r\n'
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="bookbyte.py"\r\n\r\n'
+        ).encode() + data + f"# {index}\n\r\n--{boundary}--\r\n".encode()
+        form = SubmissionForm(
+            f"multipart/form-data; boundary={boundary}",
+            store.incoming_dir,
+            max_file_bytes=GRADER_MAX_UPLOAD_BYTES,
+            max_field_bytes=GRADER_MAX_UPLOAD_BYTES,
+        )
+        for start in range(0, len(body), 64 * 1024):
+            form.feed(body[start : start + 64 * 1024])
+        form.finish()
+        store.add(form.path, form.digest, "bench", "bench")
+
+    counter = iter(range(runs))
+    try:
+        return _time(runs, lambda: run(next(counter)))
+    finally:
+        store.close()
+
+
+def bench_copytree(runs: int, workdir: Path) -> List[float]:
+    counter = iter(range(runs))
+    return _time(runs, lambda: shutil.copytree(TESTS_DIR, workdir / f"tests_{next(counter)}"))
+
+
+def bench_collection_cold(runs: int) -> List[float]:
+    """A fresh interpreter importing pytest and rewriting the tests, as subprocess mode does."""
+    command = [sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider", str(TESTS_DIR)]
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    return _time(
+        runs,
+        lambda: subprocess.run(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    )
+
+
+def bench_collection_warm(runs: int) -> List[float]:
+    """Re-collecting in a warm worker, where the rewritten modules are already imported."""
+    args = grader._warm_pytest_args(TESTS_DIR) + ["--collect-only"]
+    with _quiet():
+        return _time(runs, lambda: grader.pytest.main(args, plugins=[grader.PytestResultCollector()]))
+
+
+def bench_execution(runs: int, submission: Path) -> List[float]:
+    with _quiet():
+        return _time(runs, lambda: grader.grade_submission(str(submission), TESTS_DIR))
+
+
+def bench_reset_pytest_state(runs: int) -> List[float]:
+    def load_submission() -> None:
+        grader._finder.path = str(REFERENCE)
+        importlib.import_module(grader.SUBMISSION_MODULE)
+
+    try:
+        return _time(runs, grader._reset_pytest_state, setup=load_submission)
+    finally:
+        grader._finder.path = None
+
+
+def bench_failure_log(runs: int, workdir: Path, nodeids: List[str]) -> Dict[str, List[float]]:
+    store = FailureStore(workdir / "failures.db", workdir / "failures.journal", api._build_feedback)
+    store.open()
+    try:
+        record = _time(runs, lambda: store.record(nodeids))
+        # A flush folds whatever accumulated since the previous one; measure
+        # it at the rate the API produces records between flushes.
+        flush = _time(runs, store.flush, setup=lambda: [store.record(nodeids) for _ in range(10)])
+    finally:
+        store.close()
+    return {"failure_log_record": record, "failure_log_flush": flush}
+
+
+def run(runs: int) -> Dict[str, dict]:
+    stages: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        stages["upload_write"] = bench_upload_write(runs, workdir)
+        stages["copytree_tests"] = bench_copytree(runs, workdir)
+        stages["collection_cold"] = bench_collection_cold(max(1, runs // 4))
+
+        started = time.perf_counter()
+        with _quiet():
+            grader.warm_up(TESTS_DIR)
+        stages["warm_up"] = [time.perf_counter() - started]
+        stages["collection_warm"] = bench_collection_warm(runs)
+        stages["execution_reference"] = bench_execution(runs, REFERENCE)
+        stages["execution_skeleton"] = bench_execution(runs, SKELETON)
+        stages["reset_pytest_state"] = bench_reset_pytest_state(runs)
+
+        with _quiet():
+            graded = grader.grade_submission(str(SKELETON), TESTS_DIR)
+        failed = [item["nodeid"] for item in scoring.summarize(graded["results"])["failed"]]
+        stages.update(bench_failure_log(runs, workdir, failed))
+    return {name: summarize(samples) for name, samples in stages.items()}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the grading pipeline stages.")
+    parser.add_argument("--runs", type=int, default=20, help="iterations per stage")
+    parser.add_argument("--output", type=Path, help="JSON file (default: benchmarks/results/pipeline-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    stages = run(max(1, args.runs))
+    output = write_results("pipeline", {"runs": args.runs, "stages": stages}, args.output)
+
+    print(f"{'stage':<22} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    for name, stats in stages.items():
+        print(f"{name:<22} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['mean_ms']:>10.3f}")
+    print(f"-> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
 'use client';
 
-import { useCallback, useEffect, useMemo, useState } from 'react';
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
 
 const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL || 'https://dev.ibalton.com';
+const LOG_POLL_MS = 5000;
+const SUPERSEDED_MESSAGE = 'Esta entrega fue reemplazada por una más nueva que enviaste; se corregirá esa.';
 
 const EXPLANATIONS = {
   'tests/test_bookbyte_catalogo.py::test_agregar_y_buscar':
@@ -84,7 +86,42 @@ function FailureLog({ log }) {
   );
 }
 
-function ResultsPanel({ result }) {
+function outcomeIcon(outcome) {
+  if (outcome === 'passed') return '✅';
+  if (outcome === 'timeout') return '⏱️';
+  return '❌';
+}
+
+function ProgressPanel({ progress }) {
+  return (
+    <div className="panel">
+      <h2>Resultado del examen</h2>
+      <p>Corrigiendo… {progress.length} tests evaluados hasta ahora.</p>
+      <div className="tests">
+        <ul>
+          {progress.map((test, index) => {
+            const nodeid = test.nodeid || `desconocido-${index}`;
+            const phase = test.phase && test.phase !== 'call' ? ` (${test.phase})` : '';
+            return (
+              <li key={`${nodeid}-${test.phase || 'call'}-${index}`} className={test.outcome === 'passed' ? 'ok' : 'fail'}>
+                <div className="test-header">
+                  <span>{outcomeIcon(test.outcome)}</span>
+                  <code>{`${nodeid}${phase}`}</code>
+                </div>
+              </li>
+            );
+          })}
+        </ul>
+      </div>
+    </div>
+  );
+}
+
+function ResultsPanel({ result, progress }) {
+  if (!result && progress) {
+    return <ProgressPanel progress={progress} />;
+  }
+
   if (!result) {
     return (
       <div className="panel">
@@ -123,7 +160,7 @@ function ResultsPanel({ result }) {
             return (
               <li key={key} className={test.outcome === 'passed' ? 'ok' : 'fail'}>
                 <div className="test-header">
-                  <span>{test.outcome === 'passed' ? '✅' : '❌'}</span>
+                  <span>{outcomeIcon(test.outcome)}</span>
                   <code>{`${nodeid}${phase}`}</code>
                 </div>
                 {test.outcome !== 'passed' && explanation ? (
@@ -146,7 +183,9 @@ export default function Home() {
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(false);
   const [result, setResult] = useState(null);
+  const [progress, setProgress] = useState(null);
   const [log, setLog] = useState({ failures: {} });
+  const logVersion = useRef(null);
 
   useEffect(() => {
     if (typeof window === 'undefined') return;
@@ -167,10 +206,18 @@ export default function Home() {
 
   const fetchLog = useCallback(async () => {
     try {
-      const resp = await fetch(`${BACKEND_URL}/api2/logs`);
+      // After the first snapshot only the counters that changed are requested.
+      const query = logVersion.current === null ? '' : `?since=${logVersion.current}`;
+      const resp = await fetch(`${BACKEND_URL}/api2/logs${query}`);
+      if (resp.status === 304) return;
       if (!resp.ok) throw new Error('No se pudo obtener el historial');
       const data = await resp.json();
-      setLog(data);
+      logVersion.current = data.version ?? null;
+      if (data.full === false) {
+        setLog((current) => ({ ...current, failures: { ...(current.failures || {}), ...data.failures } }));
+      } else {
+        setLog(data);
+      }
     } catch (err) {
       console.error(err);
     }
@@ -178,12 +225,79 @@ export default function Home() {
 
   useEffect(() => {
     fetchLog();
+    const timer = setInterval(fetchLog, LOG_POLL_MS);
+    return () => clearInterval(timer);
   }, [fetchLog]);
 
+  const finishJob = useCallback((data) => {
+    setResult(data);
+    setProgress(null);
+    setLog(data.failure_log || { failures: {} });
+    setLoading(false);
+  }, []);
+
+  const failJob = useCallback((message) => {
+    setError(message || 'Error al procesar el examen');
+    setProgress(null);
+    setLoading(false);
+  }, []);
+
+  const pollJob = useCallback(
+    async (jobId) => {
+      try {
+        while (true) {
+          const resp = await fetch(`${BACKEND_URL}/api2/jobs/${jobId}`);
+          if (!resp.ok) throw new Error('No se pudo consultar el estado de la corrección');
+          const job = await resp.json();
+          if (job.status === 'done') return finishJob(job.result);
+          if (job.status === 'error') return failJob(job.error);
+          if (job.status === 'superseded') return failJob(SUPERSEDED_MESSAGE);
+          await new Promise((resolve) => setTimeout(resolve, 1000));
+        }
+      } catch (err) {
+        failJob(err.message);
+      }
+    },
+    [finishJob, failJob]
+  );
+
+  const followJob = useCallback(
+    (jobId) => {
+      if (typeof window === 'undefined' || !window.EventSource) {
+        pollJob(jobId);
+        return;
+      }
+      const source = new EventSource(`${BACKEND_URL}/api2/jobs/${jobId}/events`);
+      source.addEventListener('report', (event) => {
+        const report = JSON.parse(event.data);
+        setProgress((current) => [...(current || []), report]);
+      });
+      source.addEventListener('done', (event) => {
+        source.close();
+        finishJob(JSON.parse(event.data));
+      });
+      source.addEventListener('superseded', () => {
+        source.close();
+        failJob(SUPERSEDED_MESSAGE);
+      });
+      source.addEventListener('error', (event) => {
+        source.close();
+        if (event.data) {
+          failJob(JSON.parse(event.data).detail);
+        } else {
+          // Connection dropped (proxy, network): fall back to polling.
+          pollJob(jobId);
+        }
+      });
+    },
+    [finishJob, failJob, pollJob]
+  );
+
   const handleSubmit = async (event) => {
     event.preventDefault();
     setError('');
     setResult(null);
+    setProgress(null);
 
     if (!studentName.trim()) {
       setError('Debes ingresar tu nombre completo.');
@@ -210,12 +324,11 @@ export default function Home() {
         throw new Error(message.detail || 'Error al procesar el examen');
       }
 
-      const data = await response.json();
-      setResult(data);
-      setLog(data.failure_log || { failures: {} });
+      const { job_id: jobId } = await response.json();
+      setProgress([]);
+      followJob(jobId);
     } catch (err) {
       setError(err.message || 'Error inesperado');
-    } finally {
       setLoading(false);
     }
   };
@@ -251,7 +364,7 @@ export default function Home() {
       </section>
 
       <div className="grid">
-        <ResultsPanel result={result} />
+        <ResultsPanel result={result} progress={progress} />
         <FailureLog log={log} />
       </div>
 
@@ -4,7 +4,9 @@ Implementación usando POO con herencia múltiple y mixins
 """
 
 import csv
-from typing import Optional, List
+from bisect import bisect_left, insort
+from itertools import count
+from typing import Iterable, Iterator, NamedTuple, Optional, List, Tuple, Union
 
 
 class Producto:
@@ -49,24 +51,98 @@ class ImponibleIVA:
         return self.precio * 1.21
 
 
+class ResumenRatings(NamedTuple):
+    """Agregados de las calificaciones de un producto, para fusionar shards"""
+    cantidad: int
+    suma: float
+    histograma: Optional[Tuple[int, ...]]  # cantidad por valor 1..5, o None si no se llevó
+
+
 class Puntuable:
-    """Mixin para productos que pueden recibir calificaciones"""
+    """Mixin para productos que pueden recibir calificaciones
+    
+    No guarda cada calificación sino su cantidad, su suma y (si
+    HISTOGRAMA_RATINGS) cuántas hubo de cada valor entero 1..5, así que
+    agregar y promediar son O(1) y la memoria no crece con los ratings.
+    Los valores de clase sirven hasta el primer rating, porque el __init__
+    de Producto no llama al de los mixins.
+    """
     
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._ratings: List[float] = []
+    HISTOGRAMA_RATINGS = True
+    
+    _ratings_cantidad = 0
+    _ratings_suma = 0.0
+    # None hasta el primer rating; () si no se lleva o si se fusionó con un
+    # shard que no lo tenía
+    _ratings_histograma: Optional[List[int]] = None
     
     def agregar_rating(self, valor: float):
         """Agrega una calificación entre 1 y 5"""
         if not (1 <= valor <= 5):
             raise ValueError("El rating debe estar entre 1 y 5")
-        self._ratings.append(valor)
+        histograma = self._ratings_histograma
+        if histograma is None and self.HISTOGRAMA_RATINGS:
+            histograma = self._ratings_histograma = [0] * 5
+        if histograma:
+            histograma[min(int(valor), 5) - 1] += 1
+        self._ratings_cantidad += 1
+        self._ratings_suma += valor
+    
+    def agregar_ratings(self, valores: Iterable[float]):
+        """Agrega varias calificaciones; si alguna es inválida no agrega ninguna"""
+        cantidad, suma, histograma = 0, 0.0, [0] * 5
+        for valor in valores:
+            if not (1 <= valor <= 5):
+                raise ValueError("El rating debe estar entre 1 y 5")
+            cantidad += 1
+            suma += valor
+            histograma[min(int(valor), 5) - 1] += 1
+        if cantidad:
+            self.fusionar_ratings(ResumenRatings(cantidad, suma, tuple(histograma)))
     
     def rating_promedio(self) -> Optional[float]:
         """Retorna el promedio de calificaciones o None si no hay"""
-        if not self._ratings:
+        if not self._ratings_cantidad:
+            return None
+        return self._ratings_suma / self._ratings_cantidad
+    
+    def cantidad_ratings(self) -> int:
+        return self._ratings_cantidad
+    
+    def histograma_ratings(self) -> Optional[dict]:
+        """Cantidad de calificaciones por valor (parte entera, 1 a 5), o None si no se lleva"""
+        histograma = self._ratings_histograma
+        if histograma == ():
             return None
-        return sum(self._ratings) / len(self._ratings)
+        if histograma is None:
+            return None if not self.HISTOGRAMA_RATINGS else dict.fromkeys(range(1, 6), 0)
+        return dict(zip(range(1, 6), histograma))
+    
+    def resumen_ratings(self) -> ResumenRatings:
+        histograma = self.histograma_ratings()
+        return ResumenRatings(
+            self._ratings_cantidad,
+            self._ratings_suma,
+            None if histograma is None else tuple(histograma.values()),
+        )
+    
+    def fusionar_ratings(self, otro: Union["Puntuable", ResumenRatings]):
+        """Suma los agregados de otro producto o de un ResumenRatings (por ejemplo, de otro shard)"""
+        if not isinstance(otro, ResumenRatings):
+            otro = otro.resumen_ratings()
+        if not otro.cantidad:
+            return
+        propio = self._ratings_histograma
+        if not self.HISTOGRAMA_RATINGS or propio == () or otro.histograma is None:
+            # Un histograma parcial engañaría: se deja de llevar
+            self._ratings_histograma = ()
+        elif propio is None:
+            self._ratings_histograma = list(otro.histograma)
+        else:
+            for i, veces in enumerate(otro.histograma):
+                propio[i] += veces
+        self._ratings_cantidad += otro.cantidad
+        self._ratings_suma += otro.suma
 
 
 class LibroFisico(Producto, ImponibleIVA, Puntuable):
@@ -84,7 +160,6 @@ class LibroFisico(Producto, ImponibleIVA, Puntuable):
         
         self.isbn = isbn
         self.peso_gramos = peso_gramos
-        self._ratings = []  # Inicializar ratings list
     
     def __str__(self):
         return f'Libro Físico "{self.titulo}" de {self.autor} | ISBN: {self.isbn} | Código: {self.codigo} | ${self.precio}'
@@ -105,17 +180,26 @@ class EBook(Producto, Puntuable):
         
         self.formato = formato
         self.tam_mb = tam_mb
-        self._ratings = []  # Inicializar ratings list
     
     def __str__(self):
         return f'eBook "{self.titulo}" de {self.autor} | Formato: {self.formato} | Código: {self.codigo} | ${self.precio}'
 
 
 class Catalogo:
-    """Catálogo de productos usando diccionario para acceso eficiente por código"""
+    """Catálogo de productos usando diccionario para acceso eficiente por código
+    
+    El precio de un producto ya agregado se cambia con cambiar_precio, que
+    también actualiza el índice por precio; asignar producto.precio
+    directamente lo deja desactualizado.
+    """
     
     def __init__(self):
         self._productos = {}  # codigo -> Producto
+        # Índice por precio: (precio, orden de alta, codigo) ordenado. El orden
+        # de alta desempata igual que sorted() sobre el diccionario.
+        self._por_precio: List[Tuple[float, int, str]] = []
+        self._claves = {}  # codigo -> su entrada en _por_precio
+        self._altas = count()
     
     def agregar(self, producto: Producto):
         """Agrega un producto al catálogo"""
@@ -123,6 +207,9 @@ class Catalogo:
             print(f"Ya existe un producto con el código {producto.codigo}.")
             return
         self._productos[producto.codigo] = producto
+        clave = (producto.precio, next(self._altas), producto.codigo)
+        self._claves[producto.codigo] = clave
+        insort(self._por_precio, clave)
     
     def eliminar(self, codigo: str):
         """Elimina un producto por código"""
@@ -130,6 +217,22 @@ class Catalogo:
             print(f"No existe producto con el código {codigo}.")
             return
         del self._productos[codigo]
+        clave = self._claves.pop(codigo)
+        del self._por_precio[bisect_left(self._por_precio, clave)]
+    
+    def cambiar_precio(self, codigo: str, precio: float):
+        """Cambia el precio de un producto y lo reubica en el índice, conservando su orden de alta"""
+        if codigo not in self._productos:
+            print(f"No existe producto con el código {codigo}.")
+            return
+        if precio <= 0:
+            raise ValueError("El precio debe ser mayor a 0")
+        self._productos[codigo].precio = precio
+        anterior = self._claves[codigo]
+        del self._por_precio[bisect_left(self._por_precio, anterior)]
+        clave = (precio, anterior[1], codigo)
+        self._claves[codigo] = clave
+        insort(self._por_precio, clave)
     
     def buscar(self, codigo: str) -> Optional[Producto]:
         """Busca un producto por código"""
@@ -141,14 +244,47 @@ class Catalogo:
             print("No hay productos en el catálogo")
             return
         
-        productos_ordenados = sorted(self._productos.values(), key=lambda p: p.precio)
-        for producto in productos_ordenados:
+        for producto in self.iterar_por_precio():
             print(producto)
     
+    def iterar_por_precio(self, offset: int = 0, limit: Optional[int] = None,
+                          descendente: bool = False) -> Iterator[Producto]:
+        """Recorre los productos ordenados por precio, de a una página.
+        
+        Salta los primeros ``offset`` y devuelve como mucho ``limit`` (todos si
+        es None), sin armar la lista ordenada completa.
+        """
+        # Se valida acá y no en el generador, para fallar al llamar y no en el primer next()
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset y limit no pueden ser negativos")
+        total = len(self._por_precio)
+        fin = total if limit is None else min(total, offset + limit)
+        posiciones = range(offset, fin)
+        if descendente:
+            posiciones = (total - 1 - i for i in posiciones)
+        return self._productos_en(posiciones)
+    
+    def _productos_en(self, posiciones: Iterable[int]) -> Iterator[Producto]:
+        for i in posiciones:
+            yield self._productos[self._por_precio[i][2]]
+    
+    def _posicion(self, precio: float) -> int:
+        """Posición en el índice del primer producto con precio >= ``precio``"""
+        return bisect_left(self._por_precio, (precio,))
+    
+    def productos_en_rango(self, minimo: float, maximo: float) -> List[Producto]:
+        """Productos con minimo <= precio < maximo, ordenados por precio"""
+        desde, hasta = self._posicion(minimo), self._posicion(maximo)
+        return [self._productos[codigo] for _, _, codigo in self._por_precio[desde:hasta]]
+    
+    def contar_baratos(self, umbral: float) -> int:
+        """Cantidad de productos con precio menor al umbral, sin recorrerlos"""
+        return self._posicion(umbral)
+    
     def filtrar_baratos(self, umbral: float):
         """Muestra productos con precio menor al umbral"""
         print(f"=== PRODUCTOS CON PRECIO < {umbral} ===")
-        productos_baratos = list(filter(lambda p: p.precio < umbral, self._productos.values()))
+        productos_baratos = self.productos_en_rango(float("-inf"), umbral)
         
         for producto in productos_baratos:
             print(producto)
@@ -166,11 +302,13 @@ class Catalogo:
                 writer.writerow(['Tipo', 'Titulo', 'Autor', 'Codigo', 'Precio', 'Extra'])
                 
                 # Mapear productos a filas CSV
+                # Por atributos y no por clase, para aceptar también las
+                # variantes de sol_bookbyte_compacto
                 def producto_a_fila(producto):
-                    if isinstance(producto, LibroFisico):
+                    if hasattr(producto, "isbn"):
                         tipo = "Libro Fisico"
                         extra = f"ISBN={producto.isbn};Peso={producto.peso_gramos}g"
-                    elif isinstance(producto, EBook):
+                    elif hasattr(producto, "formato"):
                         tipo = "eBook"
                         extra = f"Formato={producto.formato};Tamaño={producto.tam_mb}MB"
                     else:
@@ -0,0 +1,403 @@
+"""
+BookByte - Catálogo columnar
+Misma interfaz que sol_bookbyte.Catalogo, pero guarda los campos de cada
+producto en columnas de NumPy en lugar de un objeto por producto, y resuelve
+filtros, precios con IVA y ordenamientos sobre todo el catálogo de forma
+vectorizada. Los productos se materializan como vistas livianas solo cuando
+se piden.
+
+agregar copia los campos del producto: el catálogo no sigue al objeto
+original, y el precio de un producto ya agregado se cambia con
+cambiar_precio, igual que en sol_bookbyte.Catalogo.
+
+NumPy es opcional: sin él este módulo se importa igual, pero crear un
+CatalogoColumnar falla con ImportError (sol_bookbyte.Catalogo no lo necesita).
+"""
+
+import csv
+from typing import Iterable, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy es opcional
+    np = None
+
+from sol_bookbyte import EBook, ImponibleIVA, LibroFisico, Producto, ResumenRatings
+
+
+# Códigos de las columnas "tipo" y "formato"
+PRODUCTO, LIBRO_FISICO, EBOOK = 0, 1, 2
+FORMATOS = ("pdf", "epub", "mobi")
+SIN_FORMATO = -1
+
+# Bits de la columna "enteros": el campo numérico se recibió como int, para
+# devolverlo igual (y que __str__ y el CSV muestren "$22000", no "$22000.0").
+_PRECIO_ENTERO, _PESO_ENTERO, _TAM_ENTERO = 1, 2, 4
+
+_COLUMNAS = {
+    "precio": "float64",
+    "peso_gramos": "float64",
+    "tam_mb": "float64",
+    "tipo": "int8",
+    "formato": "int8",
+    "enteros": "int8",
+    "alta": "int64",  # orden de alta, desempata los ordenamientos por precio
+    "ratings_cantidad": "int64",
+    "ratings_suma": "float64",
+}
+
+
+def _numero(valor: float, entero: bool):
+    return int(valor) if entero else float(valor)
+
+
+class VistaProducto:
+    """Producto de un CatalogoColumnar; lee sus campos de las columnas"""
+
+    __slots__ = ("_catalogo", "codigo")
+
+    def __init__(self, catalogo: "CatalogoColumnar", codigo: str):
+        self._catalogo = catalogo
+        self.codigo = codigo
+
+    def _fila(self) -> int:
+        return self._catalogo._filas[self.codigo]
+
+    def _valor(self, columna: str, bit: int):
+        fila = self._fila()
+        columnas = self._catalogo._columnas
+        return _numero(columnas[columna][fila], columnas["enteros"][fila] & bit)
+
+    @property
+    def titulo(self) -> str:
+        return self._catalogo._titulos[self._fila()]
+
+    @property
+    def autor(self) -> str:
+        return self._catalogo._autores[self._fila()]
+
+    @property
+    def precio(self) -> float:
+        return self._valor("precio", _PRECIO_ENTERO)
+
+    validar_ean13 = staticmethod(Producto.validar_ean13)
+    __str__ = Producto.__str__
+
+    def __eq__(self, otro):
+        if not isinstance(otro, VistaProducto):
+            return NotImplemented
+        return self._catalogo is otro._catalogo and self.codigo == otro.codigo
+
+    def __hash__(self):
+        return hash((id(self._catalogo), self.codigo))
+
+
+class _VistaPuntuable(VistaProducto):
+    """Ratings guardados como cantidad y suma en las columnas del catálogo
+    (sin histograma)"""
+
+    __slots__ = ()
+
+    def agregar_rating(self, valor: float):
+        """Agrega una calificación entre 1 y 5"""
+        self.agregar_ratings((valor,))
+
+    def agregar_ratings(self, valores: Iterable[float]):
+        """Agrega varias calificaciones; si alguna es inválida no agrega ninguna"""
+        cantidad, suma = 0, 0.0
+        for valor in valores:
+            if not (1 <= valor <= 5):
+                raise ValueError("El rating debe estar entre 1 y 5")
+            cantidad += 1
+            suma += valor
+        self.fusionar_ratings(ResumenRatings(cantidad, suma, None))
+
+    def fusionar_ratings(self, otro):
+        """Suma los agregados de otro producto o de un ResumenRatings"""
+        if not isinstance(otro, ResumenRatings):
+            otro = otro.resumen_ratings()
+        fila = self._fila()
+        columnas = self._catalogo._columnas
+        columnas["ratings_cantidad"][fila] += otro.cantidad
+        columnas["ratings_suma"][fila] += otro.suma
+
+    def cantidad_ratings(self) -> int:
+        return int(self._catalogo._columnas["ratings_cantidad"][self._fila()])
+
+    def histograma_ratings(self) -> None:
+        return None
+
+    def resumen_ratings(self) -> ResumenRatings:
+        suma = float(self._catalogo._columnas["ratings_suma"][self._fila()])
+        return ResumenRatings(self.cantidad_ratings(), suma, None)
+
+    def rating_promedio(self) -> Optional[float]:
+        """Retorna el promedio de calificaciones o None si no hay"""
+        fila = self._fila()
+        columnas = self._catalogo._columnas
+        cantidad = int(columnas["ratings_cantidad"][fila])
+        if not cantidad:
+            return None
+        return float(columnas["ratings_suma"][fila]) / cantidad
+
+
+class VistaLibroFisico(_VistaPuntuable):
+    __slots__ = ()
+
+    @property
+    def isbn(self) -> str:
+        return self._catalogo._isbns[self._fila()]
+
+    @property
+    def peso_gramos(self) -> int:
+        return self._valor("peso_gramos", _PESO_ENTERO)
+
+    precio_con_iva = ImponibleIVA.precio_con_iva
+    __str__ = LibroFisico.__str__
+
+
+class VistaEBook(_VistaPuntuable):
+    __slots__ = ()
+
+    @property
+    def formato(self) -> str:
+        return FORMATOS[self._catalogo._columnas["formato"][self._fila()]]
+
+    @property
+    def tam_mb(self) -> float:
+        return self._valor("tam_mb", _TAM_ENTERO)
+
+    __str__ = EBook.__str__
+
+
+_VISTAS = {PRODUCTO: VistaProducto, LIBRO_FISICO: VistaLibroFisico, EBOOK: VistaEBook}
+
+
+class CatalogoColumnar:
+    """Catálogo con los productos en columnas de NumPy, indexado por código.
+
+    Las filas ocupadas son siempre las primeras ``len(self)``: eliminar mueve
+    la última fila al hueco, así que el orden de las filas no es el de alta
+    (``codigos()`` y los arrays que devuelven los métodos vectorizados usan
+    el orden de las filas, alineados entre sí).
+    """
+
+    def __init__(self, capacidad: int = 1024):
+        if np is None:
+            raise ImportError("CatalogoColumnar necesita numpy (pip install numpy)")
+        self._n = 0
+        self._columnas = {nombre: np.zeros(max(1, capacidad), dtype) for nombre, dtype in _COLUMNAS.items()}
+        self._codigos: List[str] = []
+        self._titulos: List[str] = []
+        self._autores: List[str] = []
+        self._isbns: List[Optional[str]] = []
+        self._filas = {}  # codigo -> fila
+        self._altas = 0
+        # Filas ordenadas por (precio, alta) y sus precios en ese orden; se
+        # recalculan juntos cuando cambia un precio o las filas
+        self._orden = None
+        self._precios_ordenados = None
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _columna(self, nombre: str):
+        """Valores de las filas ocupadas (una vista, no una copia)"""
+        return self._columnas[nombre][: self._n]
+
+    def _crecer(self):
+        capacidad = 2 * len(self._columnas["precio"])
+        for nombre, columna in self._columnas.items():
+            nueva = np.zeros(capacidad, columna.dtype)
+            nueva[: self._n] = columna[: self._n]
+            self._columnas[nombre] = nueva
+
+    def agregar(self, producto: Producto):
+        """Agrega un producto al catálogo (copia sus campos a las columnas)"""
+        if producto.codigo in self._filas:
+            print(f"Ya existe un producto con el código {producto.codigo}.")
+            return
+        if self._n == len(self._columnas["precio"]):
+            self._crecer()
+        fila = self._n
+        enteros = _PRECIO_ENTERO if isinstance(producto.precio, int) else 0
+        peso = tam = 0
+        formato = SIN_FORMATO
+        isbn = None
+        if hasattr(producto, "isbn"):
+            tipo, isbn, peso = LIBRO_FISICO, producto.isbn, producto.peso_gramos
+            enteros |= _PESO_ENTERO if isinstance(peso, int) else 0
+        elif hasattr(producto, "formato"):
+            tipo, formato, tam = EBOOK, FORMATOS.index(producto.formato), producto.tam_mb
+            enteros |= _TAM_ENTERO if isinstance(tam, int) else 0
+        else:
+            tipo = PRODUCTO
+        ratings = producto.resumen_ratings() if hasattr(producto, "resumen_ratings") else None
+
+        c = self._columnas
+        c["precio"][fila] = producto.precio
+        c["peso_gramos"][fila] = peso
+        c["tam_mb"][fila] = tam
+        c["tipo"][fila] = tipo
+        c["formato"][fila] = formato
+        c["enteros"][fila] = enteros
+        c["alta"][fila] = self._altas
+        c["ratings_cantidad"][fila] = ratings.cantidad if ratings else 0
+        c["ratings_suma"][fila] = ratings.suma if ratings else 0.0
+        self._codigos.append(producto.codigo)
+        self._titulos.append(producto.titulo)
+        self._autores.append(producto.autor)
+        self._isbns.append(isbn)
+        self._filas[producto.codigo] = fila
+        self._altas += 1
+        self._n += 1
+        self._invalidar_orden()
+
+    def eliminar(self, codigo: str):
+        """Elimina un producto por código"""
+        if codigo not in self._filas:
+            print(f"No existe producto con el código {codigo}.")
+            return
+        fila = self._filas.pop(codigo)
+        ultima = self._n - 1
+        if fila != ultima:
+            for columna in self._columnas.values():
+                columna[fila] = columna[ultima]
+            for lista in (self._codigos, self._titulos, self._autores, self._isbns):
+                lista[fila] = lista[ultima]
+            self._filas[self._codigos[fila]] = fila
+        for lista in (self._codigos, self._titulos, self._autores, self._isbns):
+            lista.pop()
+        self._n -= 1
+        self._invalidar_orden()
+
+    def cambiar_precio(self, codigo: str, precio: float):
+        """Cambia el precio de un producto; conserva su orden de alta entre empates"""
+        if codigo not in self._filas:
+            print(f"No existe producto con el código {codigo}.")
+            return
+        if precio <= 0:
+            raise ValueError("El precio debe ser mayor a 0")
+        fila = self._filas[codigo]
+        self._columnas["precio"][fila] = precio
+        enteros = self._columnas["enteros"]
+        enteros[fila] = (enteros[fila] & ~_PRECIO_ENTERO) | (_PRECIO_ENTERO if isinstance(precio, int) else 0)
+        self._invalidar_orden()
+
+    def _invalidar_orden(self):
+        self._orden = None
+        self._precios_ordenados = None
+
+    def _vista(self, fila: int) -> VistaProducto:
+        return _VISTAS[int(self._columnas["tipo"][fila])](self, self._codigos[fila])
+
+    def buscar(self, codigo: str) -> Optional[VistaProducto]:
+        """Busca un producto por código"""
+        fila = self._filas.get(codigo)
+        return None if fila is None else self._vista(fila)
+
+    def codigos(self) -> List[str]:
+        """Códigos de los productos, en el orden de las filas"""
+        return list(self._codigos)
+
+    # -- ordenamientos y filtros ------------------------------------------------
+
+    def _filas_por_precio(self):
+        if self._orden is None:
+            # lexsort ordena por la última clave y desempata con las anteriores
+            self._orden = np.lexsort((self._columna("alta"), self._columna("precio")))
+            self._precios_ordenados = self._columna("precio")[self._orden]
+        return self._orden
+
+    def _posicion(self, precio: float) -> int:
+        """Posición en el orden por precio del primer producto con precio >= ``precio``"""
+        self._filas_por_precio()
+        return int(np.searchsorted(self._precios_ordenados, precio, side="left"))
+
+    def listar_por_precio(self):
+        """Lista todos los productos ordenados por precio ascendente"""
+        if not self._n:
+            print("No hay productos en el catálogo")
+            return
+        for producto in self.iterar_por_precio():
+            print(producto)
+
+    def iterar_por_precio(self, offset: int = 0, limit: Optional[int] = None,
+                          descendente: bool = False) -> Iterator[VistaProducto]:
+        """Recorre los productos ordenados por precio, de a una página"""
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset y limit no pueden ser negativos")
+        orden = self._filas_por_precio()
+        if descendente:
+            orden = orden[::-1]
+        fin = None if limit is None else offset + limit
+        # map y no yield: así offset/limit negativos fallan al llamar
+        return map(self._vista, orden[offset:fin])
+
+    def productos_en_rango(self, minimo: float, maximo: float) -> List[VistaProducto]:
+        """Productos con minimo <= precio < maximo, ordenados por precio"""
+        desde, hasta = self._posicion(minimo), self._posicion(maximo)
+        return [self._vista(fila) for fila in self._filas_por_precio()[desde:hasta]]
+
+    def contar_baratos(self, umbral: float) -> int:
+        """Cantidad de productos con precio menor al umbral, sin recorrerlos"""
+        return self._posicion(umbral)
+
+    def filtrar_baratos(self, umbral: float):
+        """Muestra productos con precio menor al umbral"""
+        print(f"=== PRODUCTOS CON PRECIO < {umbral} ===")
+        productos_baratos = self.productos_en_rango(float("-inf"), umbral)
+
+        for producto in productos_baratos:
+            print(producto)
+        print(f"Total: {len(productos_baratos)}")
+
+    # -- agregados vectorizados -------------------------------------------------
+
+    def precios_con_iva(self):
+        """Precio con IVA de cada producto, alineado con codigos().
+
+        Solo los libros físicos son imponibles; el resto queda en NaN.
+        """
+        precios = self._columna("precio")
+        return np.where(self._columna("tipo") == LIBRO_FISICO, precios * 1.21, np.nan)
+
+    def ratings_promedio(self):
+        """Promedio de calificaciones de cada producto (NaN si no tiene), alineado con codigos()"""
+        cantidad = self._columna("ratings_cantidad")
+        suma = self._columna("ratings_suma")
+        promedios = np.full(self._n, np.nan)
+        np.divide(suma, cantidad, out=promedios, where=cantidad > 0)
+        return promedios
+
+    # -- exportación --------------------------------------------------------------
+
+    def exportar_csv(self, ruta: str):
+        """Exporta el catálogo a un archivo CSV, en orden de alta"""
+        if not self._n:
+            return  # No genera archivo si está vacío
+
+        try:
+            with open(ruta, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Tipo', 'Titulo', 'Autor', 'Codigo', 'Precio', 'Extra'])
+
+                def producto_a_fila(fila):
+                    producto = self._vista(fila)
+                    if isinstance(producto, VistaLibroFisico):
+                        tipo = "Libro Fisico"
+                        extra = f"ISBN={producto.isbn};Peso={producto.peso_gramos}g"
+                    elif isinstance(producto, VistaEBook):
+                        tipo = "eBook"
+                        extra = f"Formato={producto.formato};Tamaño={producto.tam_mb}MB"
+                    else:
+                        tipo = "Producto"
+                        extra = ""
+
+                    return [tipo, producto.titulo, producto.autor, producto.codigo, producto.precio, extra]
+
+                filas = map(producto_a_fila, np.argsort(self._columna("alta"), kind="stable"))
+                writer.writerows(filas)
+
+        except Exception:
+            print("Error al escribir el archivo .csv")
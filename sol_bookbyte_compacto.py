@@ -0,0 +1,100 @@
+"""
+BookByte - Productos compactos
+Mismas clases e interfaz que sol_bookbyte, pero con __slots__ en toda la
+jerarquía (sin __dict__ por instancia), para catálogos grandes.
+
+Los mixins declaran __slots__ vacíos y cada clase concreta declara los
+atributos de sus mixins: dos bases con __slots__ propios no se pueden
+combinar en herencia múltiple.
+"""
+
+import sol_bookbyte
+from sol_bookbyte import Catalogo  # noqa: F401 - acepta también estas clases
+
+
+class Producto:
+    """Clase base para todos los productos"""
+
+    __slots__ = ("titulo", "autor", "codigo", "precio")
+
+    # Mismas validaciones que sol_bookbyte.Producto
+    __init__ = sol_bookbyte.Producto.__init__
+    validar_ean13 = staticmethod(sol_bookbyte.Producto.validar_ean13)
+    __str__ = sol_bookbyte.Producto.__str__
+
+
+class ImponibleIVA:
+    """Mixin para productos que tienen IVA (21%)"""
+
+    __slots__ = ()
+
+    precio_con_iva = sol_bookbyte.ImponibleIVA.precio_con_iva
+
+
+class Puntuable:
+    """Mixin para productos que pueden recibir calificaciones.
+
+    Los mismos agregados de sol_bookbyte.Puntuable, en slots que declara la
+    clase concreta.
+    """
+
+    __slots__ = ()
+
+    HISTOGRAMA_RATINGS = True
+
+    agregar_rating = sol_bookbyte.Puntuable.agregar_rating
+    agregar_ratings = sol_bookbyte.Puntuable.agregar_ratings
+    rating_promedio = sol_bookbyte.Puntuable.rating_promedio
+    cantidad_ratings = sol_bookbyte.Puntuable.cantidad_ratings
+    histograma_ratings = sol_bookbyte.Puntuable.histograma_ratings
+    resumen_ratings = sol_bookbyte.Puntuable.resumen_ratings
+    fusionar_ratings = sol_bookbyte.Puntuable.fusionar_ratings
+
+    def _sin_ratings(self):
+        self._ratings_cantidad = 0
+        self._ratings_suma = 0.0
+        self._ratings_histograma = None
+
+
+class LibroFisico(Producto, ImponibleIVA, Puntuable):
+    """Libro físico con herencia múltiple"""
+
+    __slots__ = ("isbn", "peso_gramos", "_ratings_cantidad", "_ratings_suma", "_ratings_histograma")
+
+    def __init__(self, titulo: str, autor: str, codigo: str, precio: float,
+                 isbn: str, peso_gramos: int):
+        super().__init__(titulo, autor, codigo, precio)
+
+        # Validaciones específicas
+        if not self.validar_ean13(isbn):
+            raise ValueError("ISBN inválido (debe ser EAN-13 válido)")
+        if peso_gramos <= 0:
+            raise ValueError("El peso debe ser mayor a 0")
+
+        self.isbn = isbn
+        self.peso_gramos = peso_gramos
+        self._sin_ratings()
+
+    __str__ = sol_bookbyte.LibroFisico.__str__
+
+
+class EBook(Producto, Puntuable):
+    """eBook con herencia múltiple"""
+
+    __slots__ = ("formato", "tam_mb", "_ratings_cantidad", "_ratings_suma", "_ratings_histograma")
+
+    def __init__(self, titulo: str, autor: str, codigo: str, precio: float,
+                 formato: str, tam_mb: float):
+        super().__init__(titulo, autor, codigo, precio)
+
+        # Validaciones específicas
+        if formato not in {"pdf", "epub", "mobi"}:
+            raise ValueError("Formato debe ser pdf, epub o mobi")
+        if tam_mb <= 0:
+            raise ValueError("El tamaño debe ser mayor a 0")
+
+        self.formato = formato
+        self.tam_mb = tam_mb
+        self._sin_ratings()
+
+    __str__ = sol_bookbyte.EBook.__str__
@@ -0,0 +1,72 @@
+"""Vistas y operaciones vectorizadas de CatalogoColumnar."""
+
+import csv
+import math
+
+import pytest
+
+import sol_bookbyte
+import sol_bookbyte_columnar
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def catalogo():
+    catalogo = sol_bookbyte_columnar.CatalogoColumnar(capacidad=1)
+    libro = sol_bookbyte.LibroFisico("Clean Code", "Robert C. Martin", "LBR00001", 22000, "9780132350884", 450)
+    libro.agregar_ratings([4, 5])
+    catalogo.agregar(libro)
+    catalogo.agregar(sol_bookbyte.EBook("Refactoring", "Martin Fowler", "EBK12345", 12000.0, "epub", 5.6))
+    catalogo.agregar(sol_bookbyte.Producto("Mapa", "Anónimo", "PRD00001", 500.0))
+    return catalogo
+
+
+def test_vistas_leen_las_columnas(catalogo):
+    libro = catalogo.buscar("LBR00001")
+    assert isinstance(libro, sol_bookbyte_columnar.VistaLibroFisico)
+    assert (libro.titulo, libro.isbn, libro.peso_gramos, libro.precio) == ("Clean Code", "9780132350884", 450, 22000)
+    assert str(libro) == str(
+        sol_bookbyte.LibroFisico("Clean Code", "Robert C. Martin", "LBR00001", 22000, "9780132350884", 450)
+    )
+    assert libro.precio_con_iva() == pytest.approx(22000 * 1.21)
+    assert libro.rating_promedio() == 4.5
+
+    ebook = catalogo.buscar("EBK12345")
+    assert (ebook.formato, ebook.tam_mb, ebook.rating_promedio()) == ("epub", 5.6, None)
+    ebook.agregar_rating(3)
+    assert (ebook.cantidad_ratings(), ebook.rating_promedio()) == (1, 3.0)
+    with pytest.raises(ValueError):
+        ebook.agregar_ratings([5, 6])
+    assert ebook.cantidad_ratings() == 1
+    assert catalogo.buscar("NOEXISTE") is None
+
+
+def test_eliminar_mueve_la_ultima_fila(catalogo):
+    libro = catalogo.buscar("LBR00001")
+    catalogo.eliminar("LBR00001")
+    assert len(catalogo) == 2
+    assert sorted(catalogo.codigos()) == ["EBK12345", "PRD00001"]
+    # Las vistas buscan su fila por código, así que siguen valiendo
+    assert catalogo.buscar("PRD00001").titulo == "Mapa"
+    assert libro != catalogo.buscar("EBK12345")
+
+
+def test_operaciones_vectorizadas_alineadas_con_codigos(catalogo):
+    codigos = catalogo.codigos()
+    iva = dict(zip(codigos, catalogo.precios_con_iva()))
+    promedios = dict(zip(codigos, catalogo.ratings_promedio()))
+    assert iva["LBR00001"] == pytest.approx(22000 * 1.21)
+    assert math.isnan(iva["EBK12345"]) and math.isnan(iva["PRD00001"])
+    assert promedios["LBR00001"] == 4.5 and math.isnan(promedios["EBK12345"])
+
+
+def test_exportar_csv_en_orden_de_alta(catalogo, tmp_path):
+    catalogo.eliminar("LBR00001")
+    ruta = tmp_path / "catalogo.csv"
+    catalogo.exportar_csv(str(ruta))
+    with open(ruta, encoding="utf-8") as f:
+        filas = list(csv.reader(f))
+    assert filas[0] == ["Tipo", "Titulo", "Autor", "Codigo", "Precio", "Extra"]
+    assert filas[1] == ["eBook", "Refactoring", "Martin Fowler", "EBK12345", "12000.0", "Formato=epub;Tamaño=5.6MB"]
+    assert filas[2] == ["Producto", "Mapa", "Anónimo", "PRD00001", "500.0", ""]
@@ -0,0 +1,128 @@
+"""Índice por precio de los catálogos: Catalogo (sol_bookbyte) con productos
+comunes y compactos, y CatalogoColumnar."""
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+import sol_bookbyte
+import sol_bookbyte_columnar
+import sol_bookbyte_compacto
+
+
+@pytest.fixture(
+    params=[
+        pytest.param((sol_bookbyte, sol_bookbyte.Catalogo), id="sol"),
+        pytest.param((sol_bookbyte_compacto, sol_bookbyte.Catalogo), id="compacto"),
+        pytest.param(
+            (sol_bookbyte, sol_bookbyte_columnar.CatalogoColumnar),
+            id="columnar",
+            marks=pytest.mark.skipif(sol_bookbyte_columnar.np is None, reason="necesita numpy"),
+        ),
+    ]
+)
+def M(request):
+    productos, catalogo = request.param
+    return SimpleNamespace(productos=productos, Catalogo=catalogo)
+
+
+def _ebook(M, nombre, precio):
+    return M.productos.EBook(f"Libro {nombre}", "Autor", f"EBOOK-{nombre}", precio, "pdf", 1.0)
+
+
+def _catalogo(M, *precios):
+    catalogo = M.Catalogo()
+    productos = [_ebook(M, f"E{i}", precio) for i, precio in enumerate(precios)]
+    for producto in productos:
+        catalogo.agregar(producto)
+    return catalogo, productos
+
+
+def _codigos(productos):
+    return [p.codigo.removeprefix("EBOOK-") for p in productos]
+
+
+def test_empates_en_orden_de_alta(M):
+    catalogo, _ = _catalogo(M, 200.0, 100.0, 200.0, 100.0)
+    assert _codigos(catalogo.iterar_por_precio()) == ["E1", "E3", "E0", "E2"]
+    assert _codigos(catalogo.iterar_por_precio(descendente=True)) == ["E2", "E0", "E3", "E1"]
+
+
+def test_paginacion(M):
+    catalogo, _ = _catalogo(M, 50.0, 10.0, 40.0, 20.0, 30.0)
+    assert _codigos(catalogo.iterar_por_precio(offset=1, limit=2)) == ["E3", "E4"]
+    assert _codigos(catalogo.iterar_por_precio(offset=4, limit=10)) == ["E0"]
+    assert _codigos(catalogo.iterar_por_precio(offset=9)) == []
+    assert _codigos(catalogo.iterar_por_precio(limit=0)) == []
+    assert _codigos(catalogo.iterar_por_precio(offset=1, limit=2, descendente=True)) == ["E2", "E4"]
+
+
+@pytest.mark.parametrize("kwargs", [{"offset": -1}, {"limit": -1}])
+def test_paginacion_negativa_falla_al_llamar(M, kwargs):
+    catalogo, _ = _catalogo(M, 10.0)
+    with pytest.raises(ValueError):
+        catalogo.iterar_por_precio(**kwargs)
+
+
+def test_eliminar_saca_del_indice(M):
+    catalogo, productos = _catalogo(M, 30.0, 10.0, 20.0)
+    catalogo.eliminar("EBOOK-E2")
+    assert _codigos(catalogo.iterar_por_precio()) == ["E1", "E0"]
+    assert catalogo.contar_baratos(25.0) == 1
+
+    # Volver a agregarlo lo pone último entre los de su precio
+    catalogo.agregar(_ebook(M, "E3", 10.0))
+    catalogo.agregar(productos[2])
+    assert _codigos(catalogo.iterar_por_precio()) == ["E1", "E3", "E2", "E0"]
+
+
+def test_cambiar_precio_de_codigo_inexistente(M, capsys):
+    catalogo, productos = _catalogo(M, 30.0, 10.0)
+    catalogo.eliminar("EBOOK-E1")
+    catalogo.cambiar_precio("EBOOK-E1", 50.0)
+    assert "No existe producto con el código EBOOK-E1." in capsys.readouterr().out
+    assert productos[1].precio == 10.0
+    assert _codigos(catalogo.iterar_por_precio()) == ["E0"]
+
+
+def test_cambiar_precio_invalido(M):
+    catalogo, _ = _catalogo(M, 30.0, 10.0)
+    with pytest.raises(ValueError):
+        catalogo.cambiar_precio("EBOOK-E0", 0)
+    assert catalogo.buscar("EBOOK-E0").precio == 30.0
+    assert _codigos(catalogo.iterar_por_precio()) == ["E1", "E0"]
+
+
+def test_cambio_de_precio_reordena(M, capsys):
+    catalogo, productos = _catalogo(M, 100.0, 200.0, 200.0)
+    catalogo.cambiar_precio("EBOOK-E0", 300.0)
+    assert catalogo.buscar("EBOOK-E0").precio == 300.0
+
+    catalogo.listar_por_precio()
+    salida = capsys.readouterr().out
+    assert salida.index("Libro E1") < salida.index("Libro E2") < salida.index("Libro E0")
+
+    # Conserva su orden de alta entre empates
+    catalogo.cambiar_precio("EBOOK-E0", 200.0)
+    assert _codigos(catalogo.iterar_por_precio()) == ["E0", "E1", "E2"]
+
+
+def test_cambio_de_precio_en_consultas_por_rango(M, capsys):
+    catalogo, _ = _catalogo(M, 100.0, 200.0)
+    catalogo.cambiar_precio("EBOOK-E0", 300.0)
+
+    assert catalogo.contar_baratos(250.0) == 1
+    assert _codigos(catalogo.productos_en_rango(150.0, math.inf)) == ["E1", "E0"]
+    assert _codigos(catalogo.productos_en_rango(0.0, 250.0)) == ["E1"]
+
+    catalogo.filtrar_baratos(250.0)
+    salida = capsys.readouterr().out
+    assert "Libro E0" not in salida
+    assert "Total: 1" in salida
+
+
+def test_precio_entero_se_conserva(M):
+    catalogo, _ = _catalogo(M, 10.5)
+    catalogo.cambiar_precio("EBOOK-E0", 22000)
+    assert str(catalogo.buscar("EBOOK-E0")).endswith("$22000")
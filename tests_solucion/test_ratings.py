@@ -0,0 +1,105 @@
+"""Agregados de calificaciones de Puntuable, con productos comunes y compactos."""
+
+import random
+
+import pytest
+
+import sol_bookbyte
+import sol_bookbyte_compacto
+from sol_bookbyte import ResumenRatings
+
+
+@pytest.fixture(params=[sol_bookbyte, sol_bookbyte_compacto], ids=["sol", "compacto"])
+def M(request):
+    return request.param
+
+
+def _ebook(M, nombre="E0", clase=None):
+    return (clase or M.EBook)(f"Libro {nombre}", "Autor", f"EBOOK-{nombre}", 100.0, "pdf", 1.0)
+
+
+def _libro(M):
+    return M.LibroFisico("Clean Code", "Robert C. Martin", "LBR00001", 22000.0, "9780132350884", 450)
+
+
+def test_promedio_igual_que_guardando_cada_rating(M):
+    azar = random.Random(7)
+    valores = [azar.uniform(1, 5) for _ in range(1000)]
+    ebook = _ebook(M)
+    assert ebook.rating_promedio() is None
+    for valor in valores:
+        ebook.agregar_rating(valor)
+    # La suma corre en el mismo orden que sum() sobre la lista
+    assert ebook.rating_promedio() == sum(valores) / len(valores)
+    assert ebook.cantidad_ratings() == len(valores)
+
+
+def test_rating_invalido_no_cambia_nada(M):
+    libro = _libro(M)
+    libro.agregar_rating(4)
+    for invalido in (0, 5.5, -1):
+        with pytest.raises(ValueError):
+            libro.agregar_rating(invalido)
+    assert libro.resumen_ratings() == ResumenRatings(1, 4.0, (0, 0, 0, 1, 0))
+
+
+def test_agregar_ratings_es_atomico(M):
+    ebook = _ebook(M)
+    ebook.agregar_ratings([5, 3])
+    with pytest.raises(ValueError):
+        ebook.agregar_ratings([4, 4, 6])
+    assert ebook.resumen_ratings() == ResumenRatings(2, 8.0, (0, 0, 1, 0, 1))
+    ebook.agregar_ratings([])
+    assert ebook.rating_promedio() == 4.0
+
+
+def test_histograma_por_parte_entera(M):
+    ebook = _ebook(M)
+    assert ebook.histograma_ratings() == {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+    assert ebook.resumen_ratings() == ResumenRatings(0, 0.0, (0, 0, 0, 0, 0))
+    ebook.agregar_ratings([1, 2.5, 2.99, 4.9, 5])
+    assert ebook.histograma_ratings() == {1: 1, 2: 2, 3: 0, 4: 1, 5: 1}
+
+
+def test_fusionar_suma_cantidad_suma_e_histograma(M):
+    a, b = _ebook(M, "E0"), _ebook(M, "E1")
+    a.agregar_ratings([5, 4])
+    b.agregar_ratings([1, 4, 3])
+
+    a.fusionar_ratings(b)
+    assert a.resumen_ratings() == ResumenRatings(5, 17.0, (1, 0, 1, 2, 1))
+    assert a.rating_promedio() == 17.0 / 5
+    # El otro producto no cambia
+    assert b.resumen_ratings() == ResumenRatings(3, 8.0, (1, 0, 1, 1, 0))
+
+    vacio = _ebook(M, "E2")
+    vacio.fusionar_ratings(a.resumen_ratings())
+    assert vacio.resumen_ratings() == a.resumen_ratings()
+
+
+def test_fusionar_sin_histograma_deja_de_llevarlo(M):
+    ebook = _ebook(M)
+    ebook.agregar_rating(5)
+    ebook.fusionar_ratings(ResumenRatings(2, 5.0, None))
+    assert ebook.histograma_ratings() is None
+    assert ebook.resumen_ratings() == ResumenRatings(3, 10.0, None)
+    # Los ratings nuevos siguen contando, sin histograma parcial
+    ebook.agregar_rating(2)
+    assert (ebook.cantidad_ratings(), ebook.rating_promedio(), ebook.histograma_ratings()) == (4, 3.0, None)
+
+
+def test_sin_histograma_si_no_se_lleva(M):
+    class EBookSinHistograma(M.EBook):
+        __slots__ = ()
+        HISTOGRAMA_RATINGS = False
+
+    ebook = _ebook(M, clase=EBookSinHistograma)
+    assert ebook.histograma_ratings() is None
+    ebook.agregar_ratings([2, 4])
+    ebook.agregar_rating(3)
+    assert ebook.resumen_ratings() == ResumenRatings(3, 9.0, None)
+
+    otro = _ebook(M, "E1")
+    otro.fusionar_ratings(ebook)
+    assert otro.histograma_ratings() is None
+    assert otro.rating_promedio() == 3.0